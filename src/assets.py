@@ -0,0 +1,201 @@
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, List
+
+import pygame
+from atlas import TextureAtlas, default_atlas
+from logger import debug, error
+from sprite import ImageSprite, Sprite, Square
+from surface import Screen
+from utils import BaseObject, Color, Position2d, SquareSize
+
+
+class AssetSprite(ImageSprite):
+    """
+    A handle to an image that is loading in the background.
+
+    Until the image has been decoded and packed into the atlas, the handle
+    displays its placeholder sprite; afterwards it behaves like an
+    `ImageSprite`. Handles are shared: every request for the same path and
+    scale gets the same handle, so copying one returns it unchanged.
+
+    Attributes:
+        placeholder: The sprite displayed while loading.
+        ready: Whether the image has been loaded.
+        failed: Whether the image could not be loaded. Failed handles are never loaded; request the path again
+            to retry.
+        variants: Scale -> the handles for the same image at other scales, which load along with this one.
+    """
+
+    def __init__(self, path: str, placeholder: Sprite, atlas: TextureAtlas, scale: float = 1) -> None:
+        Sprite.__init__(self, placeholder.length, scale)
+
+        self.path = path
+        self.atlas: TextureAtlas = atlas
+        self.region = None
+        self.placeholder: Sprite = placeholder
+        self.ready: bool = False
+        self.failed: bool = False
+        self.variants: Dict[float, AssetSprite] = {}
+
+    def Scaled(self, scale: float) -> "AssetSprite":
+        """
+        Returns the handle for the same image displayed at another scale.
+        """
+        if scale == self.scale:
+            return self
+
+        variant = self.variants.get(scale)
+        if variant is None:
+            variant = AssetSprite(self.path, self.placeholder, self.atlas, scale)
+            variant.failed = self.failed
+            if self.region is not None:
+                variant._Acquire(self.region)
+            self.variants[scale] = variant
+        return variant
+
+    def Display(self, screen: Screen, pos: Position2d):
+        if self.region is None:
+            self.placeholder.Display(screen, pos)
+            return
+
+        super().Display(screen, pos)
+
+    def _Loaded(self, surface: pygame.surface.Surface) -> None:
+        region = self.atlas.Add(self.path, surface)
+        self._Acquire(region)
+        for variant in self.variants.values():
+            variant._Acquire(region)
+
+    def _Failed(self) -> None:
+        self.failed = True
+        for variant in self.variants.values():
+            variant.failed = True
+
+    def _Acquire(self, region) -> None:
+        self.region = self.atlas.Acquire(region)
+        self.length = max(self.region.size)
+        self.ready = True
+
+    def __copy__(self) -> "AssetSprite":
+        return self
+
+    def __deepcopy__(self, memo) -> "AssetSprite":
+        return self
+
+
+class AssetManager(BaseObject):
+    """
+    Loads images on a pool of worker threads.
+
+    `Load` returns a handle straight away. Workers only decode files; the
+    decoded surfaces are converted and packed into the atlas on the engine
+    thread by `Poll`, which the engine calls every tick. Each path is only
+    decoded once, however many times it is requested; a path that failed to
+    load is tried again by its next request.
+
+    Args:
+        atlas: The atlas to pack loaded images into.
+        workers: The number of worker threads.
+    """
+
+    def __init__(self, atlas: TextureAtlas | None = None, workers: int = 4) -> None:
+        if atlas is None:
+            atlas = default_atlas
+
+        self.atlas: TextureAtlas = atlas
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="assets")
+
+        self.handles: Dict[str, AssetSprite] = {}
+        self.pending: Dict[str, Future] = {}
+
+    def Load(self, path: str, placeholder: Sprite | None = None, scale: float = 1) -> AssetSprite:
+        """
+        Starts loading an image, returning its handle.
+
+        Args:
+            path: The image file.
+            placeholder: The sprite to display until the image is loaded. Only used by the first request for a path.
+            scale: The scale to display the image at. Every scale of a path shares one load.
+        """
+        handle = self.handles.get(path)
+        if handle is not None:
+            return handle.Scaled(scale)
+
+        if placeholder is None:
+            placeholder = Square(SquareSize(16), Color(255, 0, 255))
+
+        handle = AssetSprite(path, placeholder, self.atlas)
+        self.handles[path] = handle
+
+        if path in self.atlas.regions:
+            # Already decoded for the atlas by someone else
+            handle._Acquire(self.atlas.regions[path])
+        else:
+            self.pending[path] = self.pool.submit(pygame.image.load, path)
+
+        return handle.Scaled(scale)
+
+    def Preload(self, paths: Iterable[str], block: bool = False, timeout: float | None = None) -> List[AssetSprite]:
+        """
+        Starts loading several images, e.g. before a scene starts.
+
+        Args:
+            paths: The image files.
+            block: Whether to wait for them to load and integrate them before returning.
+            timeout: The longest time to wait in seconds when blocking.
+        """
+        handles = [self.Load(path) for path in paths]
+        if block:
+            self.Wait(timeout)
+        return handles
+
+    def Wait(self, timeout: float | None = None) -> None:
+        """
+        Waits for every pending load, then integrates them. Must be called from the engine thread.
+        """
+        wait(list(self.pending.values()), timeout)
+        self.Poll()
+
+    def Poll(self) -> int:
+        """
+        Hands finished loads to their handles. Must be called from the engine thread.
+
+        Returns:
+            The number of loads finished.
+        """
+        if not self.pending:
+            return 0
+
+        finished = [path for path, future in self.pending.items() if future.done()]
+        for path in finished:
+            future = self.pending.pop(path)
+            handle = self.handles[path]
+
+            exception = future.exception()
+            if exception is not None:
+                # Forget the handle so the next request for the path tries again
+                del self.handles[path]
+                handle._Failed()
+                error(f"Failed to load {path}: {exception}")
+                continue
+
+            handle._Loaded(future.result())
+
+        if finished:
+            debug(f"Loaded {len(finished)} assets, {len(self.pending)} pending")
+
+        return len(finished)
+
+    def Ready(self, paths: Iterable[str] | None = None) -> bool:
+        """
+        Returns whether the given paths (or every requested path) have finished loading.
+        """
+        if paths is None:
+            return not self.pending
+        return not any(path in self.pending for path in paths)
+
+    def Close(self) -> None:
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def __str__(self) -> str:
+        return f"AssetManager(handles={len(self.handles)}, pending={len(self.pending)})"
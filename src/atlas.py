@@ -0,0 +1,288 @@
+from typing import Dict, List, Tuple
+
+import pygame
+from logger import debug, warning
+from utils import BaseObject
+
+PAGE_SIZE: int = 1024
+
+
+class AtlasRegion(BaseObject):
+    """
+    A rectangle on an atlas page holding one packed image.
+
+    Regions are shared by reference between every sprite using the same image,
+    so copying a region returns the region itself.
+
+    Attributes:
+        key: The key the image was registered under (usually its path).
+        page: The page the image was packed into.
+        rect: The area of the page occupied by the image.
+        refs: The number of sprites currently using the region.
+    """
+
+    def __init__(self, key: str, page: "AtlasPage", rect: pygame.Rect) -> None:
+        self.key = key
+        self.page = page
+        self.rect = rect
+        self.refs = 0
+
+    @property
+    def surface(self) -> pygame.surface.Surface:
+        return self.page.surface
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.rect.size
+
+    def __copy__(self) -> "AtlasRegion":
+        return self
+
+    def __deepcopy__(self, memo) -> "AtlasRegion":
+        return self
+
+    def __str__(self) -> str:
+        return f"AtlasRegion(key={self.key}, rect={self.rect})"
+
+
+class AtlasPage(BaseObject):
+    """
+    A single atlas surface packed with images using shelf packing.
+
+    Opaque and alpha images are kept on separate pages so opaque pages can be
+    converted with `convert()` and blit without per-pixel blending.
+    """
+
+    def __init__(self, width: int, height: int, alpha: bool) -> None:
+        self.width = width
+        self.height = height
+        self.alpha = alpha
+        self.regions: List[AtlasRegion] = []
+        self.last_used = 0
+
+        # Each shelf is [y, height, next free x]
+        self.shelves: List[List[int]] = []
+        self.top = 0
+
+        if alpha:
+            surface = pygame.Surface((width, height), pygame.SRCALPHA)
+            surface.fill((0, 0, 0, 0))
+            if pygame.display.get_surface() is not None:
+                surface = surface.convert_alpha()
+        else:
+            surface = pygame.Surface((width, height))
+            if pygame.display.get_surface() is not None:
+                surface = surface.convert()
+
+        self.surface: pygame.surface.Surface = surface
+
+    def Pack(self, width: int, height: int) -> pygame.Rect | None:
+        """
+        Reserves an area on the page.
+
+        Args:
+            width: The width of the area.
+            height: The height of the area.
+
+        Returns:
+            The reserved rect, or None if the page has no room.
+        """
+        best: List[int] | None = None
+        for shelf in self.shelves:
+            if shelf[1] >= height and self.width - shelf[2] >= width:
+                if best is None or shelf[1] < best[1]:
+                    best = shelf
+
+        if best is None:
+            if self.top + height > self.height or width > self.width:
+                return None
+            best = [self.top, height, 0]
+            self.shelves.append(best)
+            self.top += height
+
+        rect = pygame.Rect(best[2], best[0], width, height)
+        best[2] += width
+        return rect
+
+    @property
+    def used(self) -> bool:
+        return any(region.refs > 0 for region in self.regions)
+
+    @property
+    def memory(self) -> int:
+        return self.width * self.height * self.surface.get_bytesize()
+
+    def __str__(self) -> str:
+        return f"AtlasPage(size=({self.width}, {self.height}), alpha={self.alpha}, regions={len(self.regions)})"
+
+
+class TextureAtlas(BaseObject):
+    """
+    Loads images once and packs them into shared atlas pages.
+
+    Every sprite using the same image receives the same `AtlasRegion`, so an
+    image is decoded, converted and stored exactly once no matter how many
+    objects display it.
+
+    Attributes:
+        page_size: The width and height of newly created pages.
+        budget: The number of bytes of pages to keep before unused pages are evicted (None for no limit).
+    """
+
+    def __init__(self, page_size: int = PAGE_SIZE, budget: int | None = None) -> None:
+        self.page_size = page_size
+        self.budget = budget
+        self.pages: List[AtlasPage] = []
+        self.regions: Dict[str, AtlasRegion] = {}
+        self._uses = 0
+
+    def Load(self, path: str) -> AtlasRegion:
+        """
+        Returns the region for an image file, loading and packing it if needed.
+
+        Args:
+            path: The path to the image file.
+
+        Returns:
+            The shared region for the image, with its reference count incremented.
+        """
+        region = self.regions.get(path)
+        if region is None:
+            region = self.Add(path, pygame.image.load(path))
+
+        return self.Acquire(region)
+
+    def Add(self, key: str, image: pygame.surface.Surface) -> AtlasRegion:
+        """
+        Packs an already decoded surface into the atlas.
+
+        Args:
+            key: The key to register the image under.
+            image: The surface to pack.
+
+        Returns:
+            The region the image was packed into. Its reference count is not incremented.
+        """
+        existing = self.regions.get(key)
+        if existing is not None:
+            return existing
+
+        alpha = image.get_flags() & pygame.SRCALPHA != 0
+        if pygame.display.get_surface() is not None:
+            image = image.convert_alpha() if alpha else image.convert()
+
+        width, height = image.get_size()
+        page, rect = self._Pack(width, height, alpha)
+
+        page.surface.blit(image, rect.topleft, special_flags=pygame.BLEND_RGBA_MAX if alpha else 0)
+        # A page just packed into counts as recently used, so a later Trim doesn't evict it before
+        # the caller has had a chance to acquire the region
+        self._uses += 1
+        page.last_used = self._uses
+
+        region = AtlasRegion(key, page, rect)
+        page.regions.append(region)
+        self.regions[key] = region
+
+        self.Trim(keep=page)
+
+        return region
+
+    def Acquire(self, region: AtlasRegion) -> AtlasRegion:
+        """
+        Marks a region as used by one more sprite.
+        """
+        region.refs += 1
+        self._uses += 1
+        region.page.last_used = self._uses
+        return region
+
+    def Release(self, region: AtlasRegion) -> None:
+        """
+        Marks a region as no longer used by a sprite.
+
+        The page is kept until `Trim` or `Collect` decides to evict it.
+        """
+        if region.refs > 0:
+            region.refs -= 1
+
+    def Trim(self, keep: AtlasPage | None = None) -> None:
+        """
+        Evicts the least recently used unused pages until the atlas fits its budget.
+
+        Args:
+            keep: A page that must not be evicted, such as one that was just packed into.
+        """
+        if self.budget is None:
+            return
+
+        for page in sorted(self.pages, key=lambda p: p.last_used):
+            if self.memory <= self.budget:
+                break
+            if page is not keep and not page.used:
+                self._Evict(page)
+
+        if self.memory > self.budget:
+            warning(f"Texture atlas is using {self.memory} bytes, over its budget of {self.budget}")
+
+    def Collect(self) -> int:
+        """
+        Evicts every page with no used regions.
+
+        Returns:
+            The number of bytes freed.
+        """
+        freed = 0
+        for page in [p for p in self.pages if not p.used]:
+            freed += page.memory
+            self._Evict(page)
+        return freed
+
+    @property
+    def memory(self) -> int:
+        """
+        The number of bytes held by atlas pages.
+        """
+        return sum(page.memory for page in self.pages)
+
+    def Stats(self) -> dict:
+        return {
+            "pages": len(self.pages),
+            "regions": len(self.regions),
+            "used_regions": sum(1 for r in self.regions.values() if r.refs > 0),
+            "bytes": self.memory,
+        }
+
+    def _Pack(self, width: int, height: int, alpha: bool) -> Tuple[AtlasPage, pygame.Rect]:
+        for page in self.pages:
+            if page.alpha == alpha:
+                rect = page.Pack(width, height)
+                if rect is not None:
+                    return page, rect
+
+        # Images larger than a page get a page of their own
+        page = AtlasPage(max(width, self.page_size), max(height, self.page_size), alpha)
+        self.pages.append(page)
+        debug(f"Created atlas page {len(self.pages)} ({page.width}x{page.height}, alpha={alpha})")
+
+        rect = page.Pack(width, height)
+        assert rect is not None
+        return page, rect
+
+    def _Evict(self, page: AtlasPage) -> None:
+        for region in page.regions:
+            self.regions.pop(region.key, None)
+        self.pages.remove(page)
+        debug(f"Evicted atlas page ({page.width}x{page.height}, {len(page.regions)} regions)")
+
+    def __copy__(self) -> "TextureAtlas":
+        return self
+
+    def __deepcopy__(self, memo) -> "TextureAtlas":
+        return self
+
+    def __str__(self) -> str:
+        return f"TextureAtlas(pages={len(self.pages)}, regions={len(self.regions)}, bytes={self.memory})"
+
+
+default_atlas: TextureAtlas = TextureAtlas()
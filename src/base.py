@@ -1,16 +1,40 @@
+from typing import Any, Callable, Coroutine
 from event import EventManager
+from tasks import default_tasks
 import utils
 
+# Tick priorities, most important first. Critical work runs every tick even
+# when the engine's frame budget is used up.
+PRIORITY_CRITICAL: int = 0
+PRIORITY_HIGH: int = 1
+PRIORITY_NORMAL: int = 2
+PRIORITY_LOW: int = 3
+
+# Tick frequencies: a positive frequency N ticks every N frames.
+EVERY_FRAME: int = 1
+BEST_EFFORT: int = 0
+
 
 class BaseComponent(utils.BaseObject):
     """
     The base class for game components.
 
+    Components that don't override `_tick` (and don't pass another tick
+    function) are never ticked, and sleeping components are left out of the
+    tick list until they are woken by `Wake`, an event or their sleep timer.
+
     Attributes:
         tick: A reference to the component's tick method.
         _state: Internal dictionary to store state information.
+        sleeping: Whether the component is currently asleep.
+        priority: The priority of the tick when the engine runs with a frame budget.
+        frequency: How often to tick with a frame budget: every N frames, or `BEST_EFFORT` for spare time only.
     """
 
+    priority: int = PRIORITY_NORMAL
+    frequency: int = EVERY_FRAME
+    _phase: int | None = None
+
     def __init__(self, tick):
         """
         Initializes the BaseComponent.
@@ -22,6 +46,15 @@ class BaseComponent(utils.BaseObject):
         self.tick = tick
         self._state = {}
         self.eventmanager = EventManager()
+        self.eventmanager.on_event = self.Wake
+
+        self.sleeping: bool = False
+        self._sleep_for: int | None = None
+        self._sleeps: int = 0
+        self._listener: Callable[[], None] | None = None
+
+        # Components that never tick never read their events, so don't let them pile up
+        self.eventmanager.discard = not self.Ticks
 
     def OnTick(self, entity) -> None:
         """
@@ -32,6 +65,61 @@ class BaseComponent(utils.BaseObject):
         """
         self.tick(entity, self.eventmanager.get())
 
+    def _tick(self, entity, events) -> None:
+        """
+        The default tick, which does nothing. Components that never override it are not ticked.
+        """
+        pass
+
+    @property
+    def Ticks(self) -> bool:
+        """
+        Whether the component has a tick that does anything.
+        """
+        return getattr(self.tick, "__func__", None) is not BaseComponent._tick
+
+    def Sleep(self, ticks: int | None = None) -> None:
+        """
+        Stops ticking the component until it is woken.
+
+        Args:
+            ticks: The number of ticks to sleep for. Defaults to sleeping until `Wake` is called or an event is added.
+        """
+        self.sleeping = True
+        self._sleeps += 1
+        self._sleep_for = ticks
+        self._Changed()
+
+    def Wake(self) -> None:
+        """
+        Resumes ticking the component.
+        """
+        if not self.sleeping:
+            return
+
+        self.sleeping = False
+        self._sleep_for = None
+        self._Changed()
+
+    def Await(self, coroutine: Coroutine, name: str = "", callback: Callable[[Any], None] | None = None) -> None:
+        """
+        Runs a coroutine alongside the simulation. Only available while the engine runs with `RunAsync`.
+
+        When it finishes, a `TaskDone` event carrying its result is sent to the
+        component on the next tick, waking it if it sleeps. The task is
+        cancelled if the component's GameObject is removed from the engine.
+
+        Args:
+            coroutine: The coroutine to run, such as a network request or file write.
+            name: A name to tell the component's tasks apart in their `TaskDone` events.
+            callback: Also called with the result on the next tick.
+        """
+        default_tasks.Submit(coroutine, callback, self, name)
+
+    def _Changed(self) -> None:
+        if self._listener is not None:
+            self._listener()
+
     def state(self) -> dict:
         """
         Returns the component's internal state dictionary.
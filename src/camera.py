@@ -19,21 +19,38 @@ class ViewportSize2d:
     buffer: float | int = 5
 
 class Camera2d(BaseObject):
-    def __init__(self, size: ViewportSize2d, initial_pos: Position2d = Position2d(0, 0, Rotation2d(0))) -> None:
+    def __init__(
+        self,
+        size: ViewportSize2d,
+        initial_pos: Position2d = Position2d(0, 0, Rotation2d(0)),
+        zoom: float = 1,
+        viewport: pygame.Rect | None = None
+    ) -> None:
+        """
+        Args:
+            size: The size of the view in screen pixels.
+            initial_pos: The world position at the center of the view.
+            zoom: The number of screen pixels per world unit.
+            viewport: The area of the screen the camera draws into. Defaults to the whole screen.
+        """
         self.realsize: ViewportSize2d = copy(size)
         self.pos: Position2d = initial_pos
         self.size = copy(size)
+        self.zoom: float = zoom
+        self.viewport: pygame.Rect | None = viewport
 
         self.size.x += self.size.buffer
         self.size.y += self.size.buffer
 
     def IsVisible(self, pos: Position2d, size: int | float) -> bool:
         vis: bool = False
+        half_x = self.size.x / (2 * self.zoom)
+        half_y = self.size.y / (2 * self.zoom)
         if (
-            self.pos.x - (self.size.x / 2) < pos.x + (size / 2) and
-            self.pos.x + (self.size.x / 2) > pos.x - (size / 2) and
-            self.pos.y - (self.size.y / 2) < pos.y + (size / 2) and
-            self.pos.y + (self.size.y / 2) > pos.y - (size / 2)
+            self.pos.x - half_x < pos.x + (size / 2) and
+            self.pos.x + half_x > pos.x - (size / 2) and
+            self.pos.y - half_y < pos.y + (size / 2) and
+            self.pos.y + half_y > pos.y - (size / 2)
         ):
             vis = True
             # debug("Rendered at: " + self.GlobalToLocal(pos).__str__())
@@ -44,8 +61,16 @@ class Camera2d(BaseObject):
     def Move(self, new_pos: Position2d):
         self.pos += new_pos
 
+    def SetZoom(self, zoom: float):
+        if zoom <= 0:
+            raise Exception("Zoom must be positive")
+        self.zoom = zoom
+
+    def Zoom(self, factor: float):
+        self.SetZoom(self.zoom * factor)
+
     def GlobalToLocal(self, global_pos: Position2d) -> Position2d:
-        local_x = global_pos.x - self.pos.x
-        local_y = global_pos.y - self.pos.y 
+        local_x = (global_pos.x - self.pos.x) * self.zoom
+        local_y = (global_pos.y - self.pos.y) * self.zoom
 
         return Position2d(local_x, local_y, global_pos.rot)
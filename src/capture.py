@@ -0,0 +1,217 @@
+import multiprocessing
+from multiprocessing import shared_memory
+import os
+import queue
+from collections import deque
+from typing import Any, Deque, List, Tuple
+
+import pygame
+from logger import debug, error, warning
+from utils import BaseObject
+
+FORMAT_PNG: str = "png"
+FORMAT_RAW: str = "raw"
+
+# Bytes per pixel of a captured frame (RGB24)
+PIXEL_BYTES: int = 3
+# Seconds between checks that the writer is still alive while blocked waiting for a slot
+WAIT_INTERVAL: float = 0.5
+
+
+def _Write(names: List[str], size: Tuple[int, int], format: str, path: str, frames: Any, free: Any) -> None:
+    """
+    Runs in the writer process: encodes frames from the shared slots until it receives None.
+    """
+    slots = [shared_memory.SharedMemory(name=name) for name in names]
+    raw = open(path, "wb") if format == FORMAT_RAW else None
+    length = size[0] * size[1] * PIXEL_BYTES
+
+    try:
+        while True:
+            item = frames.get()
+            if item is None:
+                break
+
+            slot, number = item
+            if raw is not None:
+                raw.write(slots[slot].buf[:length])
+            else:
+                surface = pygame.image.frombuffer(slots[slot].buf[:length], size, "RGB")
+                pygame.image.save(surface, os.path.join(path, f"frame_{number:06d}.png"))
+                del surface
+
+            free.put(slot)
+    finally:
+        if raw is not None:
+            raw.close()
+        for shm in slots:
+            shm.close()
+
+
+class FrameCapture(BaseObject):
+    """
+    Records presented frames without blocking the engine loop.
+
+    Each captured frame is blitted into one of a small pool of shared memory
+    slots and its slot index is handed to a writer process, which encodes it
+    and hands the slot back. The engine thread only ever copies pixels; PNG
+    compression and disk writes happen in the other process.
+
+    PNG sequences are written to `path` as `frame_000000.png`, ... Raw video
+    is a single file of RGB24 frames back to back, e.g. for
+    `ffmpeg -f rawvideo -pix_fmt rgb24 -s WxH -r FPS -i path out.mp4`.
+
+    Args:
+        path: The directory for PNG frames, or the file for raw video.
+        format: `FORMAT_PNG` or `FORMAT_RAW`.
+        every: Capture every Nth presented frame.
+        slots: The number of frames that can be waiting for the writer.
+        block: What to do when every slot is in use because the writer has fallen behind:
+            wait for one to free up, or drop the frame. Frames are dropped anyway once the writer has died.
+
+    Attributes:
+        captured: The number of frames handed to the writer.
+        dropped: The number of frames dropped because no slot was free or the window changed size.
+        dead: Whether the writer process exited while frames were waiting for it.
+    """
+
+    def __init__(self, path: str, format: str = FORMAT_PNG, every: int = 1, slots: int = 4, block: bool = False) -> None:
+        if format not in (FORMAT_PNG, FORMAT_RAW):
+            raise Exception(f"Unknown capture format {format}")
+
+        self.path = path
+        self.format = format
+        self.every = max(1, every)
+        self.slot_count = max(1, slots)
+        self.block = block
+
+        self.size: Tuple[int, int] | None = None
+        self.slots: List[shared_memory.SharedMemory] = []
+        self.surfaces: List[pygame.surface.Surface] = []
+        self.free: Deque[int] = deque()
+
+        self._frames: Any = None
+        self._returned: Any = None
+        self._process: Any = None
+
+        self.frame: int = 0
+        self.captured: int = 0
+        self.dropped: int = 0
+        self.dead: bool = False
+
+    def Start(self, size: Tuple[int, int]) -> None:
+        """
+        Allocates the slots for frames of a size and starts the writer process. Called by the first `Frame`.
+        """
+        if self._process is not None:
+            return
+
+        if self.format == FORMAT_PNG:
+            os.makedirs(self.path, exist_ok=True)
+
+        self.size = size
+        length = size[0] * size[1] * PIXEL_BYTES
+        for i in range(self.slot_count):
+            shm = shared_memory.SharedMemory(create=True, size=length)
+            self.slots.append(shm)
+            # Blitting into the surface writes straight into shared memory
+            self.surfaces.append(pygame.image.frombuffer(shm.buf, size, "RGB"))
+            self.free.append(i)
+
+        # Spawned rather than forked so the writer doesn't inherit the display
+        context = multiprocessing.get_context("spawn")
+        self._frames = context.Queue()
+        self._returned = context.Queue()
+        self._process = context.Process(
+            target=_Write,
+            args=([shm.name for shm in self.slots], size, self.format, self.path, self._frames, self._returned),
+            daemon=True,
+        )
+        self._process.start()
+
+        debug(f"Capturing {size[0]}x{size[1]} frames to {self.path} as {self.format}")
+
+    def Frame(self, surface: pygame.surface.Surface) -> bool:
+        """
+        Captures a presented frame, unless it is skipped or dropped.
+
+        Returns:
+            Whether the frame was handed to the writer.
+        """
+        number = self.frame
+        self.frame += 1
+        if number % self.every:
+            return False
+
+        if self._process is None:
+            self.Start(surface.get_size())
+
+        if surface.get_size() != self.size:
+            self.dropped += 1
+            return False
+
+        self._Reclaim()
+        if not self.free:
+            if not self.block or not self._Wait():
+                self.dropped += 1
+                return False
+
+        slot = self.free.popleft()
+        self.surfaces[slot].blit(surface, (0, 0))
+        self._frames.put((slot, self.captured))
+        self.captured += 1
+        return True
+
+    def _Wait(self) -> bool:
+        # Waits for the writer to hand back a slot, giving up if it has died
+        if self.dead:
+            return False
+        while True:
+            try:
+                self.free.append(self._returned.get(timeout=WAIT_INTERVAL))
+                return True
+            except queue.Empty:
+                if not self._process.is_alive():
+                    if not self.dead:
+                        self.dead = True
+                        error(f"The writer capturing to {self.path} exited with code {self._process.exitcode}")
+                    return False
+
+    def _Reclaim(self) -> None:
+        # Takes back the slots the writer has finished with
+        while True:
+            try:
+                self.free.append(self._returned.get_nowait())
+            except queue.Empty:
+                return
+
+    def Close(self) -> None:
+        """
+        Waits for the writer to encode every captured frame, then releases the slots.
+        """
+        if self._process is None:
+            return
+
+        self._frames.put(None)
+        self._process.join()
+        self._process = None
+
+        self.surfaces = []
+        for shm in self.slots:
+            shm.close()
+            shm.unlink()
+        self.slots = []
+        self.free.clear()
+
+        if self.dropped:
+            warning(f"Dropped {self.dropped} frames while capturing to {self.path}")
+        debug(f"Captured {self.captured} frames to {self.path}")
+
+    def __eq__(self, other) -> bool:
+        return self is other
+
+    def __hash__(self) -> int:
+        return id(self)
+
+    def __str__(self) -> str:
+        return f"FrameCapture(path={self.path}, format={self.format}, captured={self.captured}, dropped={self.dropped})"
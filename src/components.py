@@ -13,6 +13,7 @@ from sprite import Sprite
 from surface import Screen
 import utils
 from gameobject import GameObject
+from hierarchy import TransformHierarchy, default_hierarchy
 from base import BaseComponent
 from dataclasses import dataclass
 
@@ -75,6 +76,9 @@ class VelocityControl(BaseComponent):
     """
     This component controls the velocity of a GameObject.
 
+    It does nothing on ticks by itself, so it is left out of the tick list
+    unless a subclass overrides `_tick`.
+
     Attributes:
         _state: Internal dictionary storing the current velocity.
     """
@@ -94,19 +98,6 @@ class VelocityControl(BaseComponent):
 
         RequireComponent(obj, Transform, Transform())
 
-    def _tick(self, entity: GameObject, event: List[event.Event]) -> None:
-        """
-        This method is called every game tick.
-
-        Args:
-            entity: The GameObject this component is attached to.
-            event: A list of events that occurred during the tick.
-
-        This method does not currently implement any functionality related to
-        velocity control. It's intended to be overridden in subclasses.
-        """
-        pass
-
     def AddVelocity(self, vel: Velocity) -> None:
         """
         Adds a velocity to the current velocity.
@@ -199,16 +190,25 @@ class Controls(BaseComponent):
             velcontrol.SetVelocity(Velocity(0, 0))
 
 class Transform(BaseComponent):
+    """
+    The position and rotation of a GameObject.
+
+    `pos` is relative to the parent transform, if there is one. Transforms
+    with a parent are tracked by a `TransformHierarchy`, which caches their
+    world positions and only recomputes them when they or an ancestor move.
+    """
+
     def __init__(self, initial_pos: utils.Position2d = utils.Position2d(0, 0, utils.Rotation2d(0))):
         super().__init__(self._tick)
         
         self.pos = initial_pos
 
-    def _tick(self, entity: GameObject, events: List[event.Event]) -> None:
-        pass
-    
+        self._hierarchy: TransformHierarchy | None = None
+        self._node: int = -1
+
     def SetPosition(self, new_pos: utils.Position2d):
         self.pos = new_pos
+        self._Moved()
 
     def AddPosition(self, pos: utils.Position2d):
         self.pos.x += pos.x
@@ -216,10 +216,55 @@ class Transform(BaseComponent):
         self.pos.rot += pos.rot
 
         self.pos.__post_init__()
+        self._Moved()
 
     def GetPos(self):
+        """
+        Returns the world position. For transforms without a parent this is `pos` itself.
+        """
+        if self._hierarchy is None or self._hierarchy.parent[self._node] == -1:
+            return self.pos
+        return self._hierarchy.WorldPos(self)
+
+    def GetLocalPos(self):
         return self.pos
 
+    def SetParent(self, parent: "Transform | None", hierarchy: TransformHierarchy | None = None):
+        """
+        Attaches the transform to a parent, so it follows the parent's movement and rotation.
+
+        Args:
+            parent: The new parent, or None to detach. The current `pos` becomes relative to the parent.
+            hierarchy: The hierarchy to track the transforms in. Defaults to the one either transform is already in.
+        """
+        if hierarchy is None:
+            hierarchy = self._hierarchy
+        if hierarchy is None and parent is not None:
+            hierarchy = parent._hierarchy
+        if hierarchy is None:
+            hierarchy = default_hierarchy
+
+        if parent is not None and parent._hierarchy is not None and parent._hierarchy is not hierarchy:
+            raise Exception("Cannot parent transforms in different hierarchies")
+
+        hierarchy.SetParent(self, parent)
+
+    @property
+    def Parent(self) -> "Transform | None":
+        if self._hierarchy is None:
+            return None
+        return self._hierarchy.Parent(self)
+
+    @property
+    def Children(self) -> List["Transform"]:
+        if self._hierarchy is None:
+            return []
+        return self._hierarchy.Children(self)
+
+    def _Moved(self):
+        if self._hierarchy is not None:
+            self._hierarchy.MarkDirty(self)
+
 class Model(BaseComponent):
     def __init__(self, obj: GameObject, sprite: Sprite = Sprite()):
         super().__init__(self._tick)
@@ -233,15 +278,16 @@ class Model(BaseComponent):
         if t is not None and isinstance(t, Transform):
             self.transform: Transform = t
 
-    def _tick(self, entity: GameObject, events: List[event.Event]) -> None:
-        pass
-
     def Render(self, screen: Screen, camera: Camera2d):
-        if (camera.IsVisible(self.transform.GetPos(), self.sprite.length)):
+        if (self.Visible(camera)):
             # debug(self.transform.GetPos().__str__())
             
             self._Render(screen, camera.GlobalToLocal(self.transform.GetPos()))
 
+    def Visible(self, camera: Camera2d) -> bool:
+        pos = self.transform.GetPos()
+        return camera.IsVisible(pos, self.sprite.Extent(pos))
+
     def _Render(self, screen: Screen, local_pos: utils.Position2d):
         self.sprite.Display(screen, local_pos)
 
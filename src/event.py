@@ -2,8 +2,9 @@ from dataclasses import dataclass
 from functools import update_wrapper
 import threading
 from time import sleep
-from typing import Any, List
+from typing import Any, Callable, Dict, List
 from keyboard import add_hotkey, on_press, on_release
+import pygame
 from pynput.keyboard import Key, Listener
 
 EVENT_MAX: int = 1
@@ -82,11 +83,95 @@ class Keydown(Event):
             self.data = {}
 
 
+@dataclass
+class TaskDone(Event):
+    """
+    An event delivered to a component when a coroutine it started has finished.
+
+    Args:
+        name: The name the task was started with.
+        data: `result` holds the coroutine's result and `error` the exception it raised, if any.
+    """
+
+
 def match_key(key: Keydown, to_match: str):
     return key.name.lower() == to_match or key.name.upper() == to_match
 
 
-class InputManager:
+class InputSource:
+    """
+    The base class for anything that supplies key events to components.
+
+    The engine calls `Advance` once at the start of every tick, so every
+    component sees the same events for that tick.
+
+    Attributes:
+        finished: Whether the source has no more input to give (e.g. a finished replay).
+    """
+
+    finished: bool = False
+
+    def Advance(self, tick: int) -> None:
+        """
+        Moves the source on to the given tick.
+        """
+        pass
+
+    def get_events(self) -> List[Keydown]:
+        return []
+
+    def Feed(self, event: pygame.event.Event) -> None:
+        """
+        Receives a KEYDOWN or KEYUP event drained from the pygame event queue by the engine.
+        """
+        pass
+
+    def Flush(self) -> None:
+        """
+        Writes out anything buffered by the source. Called by the engine whenever its loop ends.
+        """
+        pass
+
+    def Close(self) -> None:
+        """
+        Releases anything held by the source.
+        """
+        pass
+
+
+_backend: InputSource | None = None
+_default: InputSource | None = None
+
+
+def SetInputBackend(backend: InputSource | None) -> InputSource | None:
+    """
+    Sets the input source used by every EventManager. None restores the live keyboard listener.
+
+    Returns:
+        The backend that was set before, so it can be put back later.
+    """
+    global _backend
+    previous = _backend
+    _backend = backend
+    return previous
+
+
+def GetInputBackend() -> InputSource:
+    """
+    Returns the input source used by every EventManager.
+
+    When no backend has been set, a single live keyboard listener is started
+    the first time input is needed and shared from then on.
+    """
+    global _default
+    if _backend is not None:
+        return _backend
+    if _default is None:
+        _default = InputManager()
+    return _default
+
+
+class InputManager(InputSource):
     """
     A class that listens for key presses and returns a list of KeyDown events.
     """
@@ -133,6 +218,14 @@ class InputManager:
         # threading.Thread(target=lambda: self.empty_events()).start()
         return events
 
+    def Close(self) -> None:
+        """
+        Stops the keyboard listener.
+        """
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
     def add_hotkey(self, combination: str, callback):
         """
         Adds a hotkey for a callback
@@ -148,20 +241,154 @@ class InputManager:
         self.events = []
 
 
+# Codes below 0x200 and scancode-derived keys each get 0x200 fixed slots; other character codes are given
+# the remaining slots as they are first seen
+KEY_SLOTS: int = 2048
+_FIXED_SLOTS: int = 0x400
+_unicode_slots: Dict[int, int] = {}
+
+
+def key_index(key: int) -> int:
+    """
+    Maps a pygame key code to a slot in a KeyState table.
+
+    Character keys below 0x200 use their code directly and the remaining
+    keys (arrows, modifiers, function keys) are derived from scancodes, so
+    both ranges fit in the first 0x400 slots. Other character codes, such as
+    Cyrillic or Greek letters, are given one of the remaining slots the first
+    time they are seen, so no two keys ever share a slot. Should a process
+    see more distinct character keys than there are slots, the extra ones
+    share the last slot.
+    """
+    if key & 0x40000000:
+        return 0x200 | (key & 0x1FF)
+    if key < 0x200:
+        return key
+
+    index = _unicode_slots.get(key)
+    if index is None:
+        index = min(_FIXED_SLOTS + len(_unicode_slots), KEY_SLOTS - 1)
+        if index < KEY_SLOTS - 1:
+            _unicode_slots[key] = index
+    return index
+
+
+class KeyState(InputSource):
+    """
+    Tracks held keys in a fixed-size table fed from the pygame event queue.
+
+    The engine hands every KEYDOWN and KEYUP it drains in `CheckNative` to
+    `Feed`, so there is no listener thread and nothing to lock: all updates
+    happen on the engine thread. Each tick costs O(events), and queries do
+    no allocation or string handling.
+
+    Edge flags describe the events fed since the previous `Advance`, so a key
+    pressed and released within one tick still reports `was_pressed`.
+    """
+
+    def __init__(self) -> None:
+        self.down = bytearray(KEY_SLOTS)
+        self.pressed = bytearray(KEY_SLOTS)
+        self.released = bytearray(KEY_SLOTS)
+
+        self._pending_pressed: List[int] = []
+        self._pending_released: List[int] = []
+        self._edges: List[int] = []
+
+        # Slot -> Keydown event for the keys currently held, in press order
+        self.held: dict[int, Keydown] = {}
+        self._events: List[Keydown | None] = [None] * KEY_SLOTS
+
+    def Feed(self, event: pygame.event.Event) -> None:
+        index = key_index(event.key)
+        if event.type == pygame.KEYDOWN:
+            if not self.down[index]:
+                self.down[index] = 1
+                self._pending_pressed.append(index)
+
+                e = self._events[index]
+                if e is None:
+                    e = Keydown(1, pygame.key.name(event.key))
+                    self._events[index] = e
+                self.held[index] = e
+        elif event.type == pygame.KEYUP:
+            if self.down[index]:
+                self.down[index] = 0
+                self._pending_released.append(index)
+                self.held.pop(index, None)
+
+    def Advance(self, tick: int) -> None:
+        for index in self._edges:
+            self.pressed[index] = 0
+            self.released[index] = 0
+
+        self._edges = self._pending_pressed + self._pending_released
+        for index in self._pending_pressed:
+            self.pressed[index] = 1
+        for index in self._pending_released:
+            self.released[index] = 1
+
+        self._pending_pressed = []
+        self._pending_released = []
+
+    def is_down(self, key: int) -> bool:
+        """
+        Returns whether a key is held. `key` is a pygame key code such as `pygame.K_w`.
+        """
+        return self.down[key_index(key)] == 1
+
+    def was_pressed(self, key: int) -> bool:
+        """
+        Returns whether a key went down during the last tick.
+        """
+        return self.pressed[key_index(key)] == 1
+
+    def was_released(self, key: int) -> bool:
+        """
+        Returns whether a key went up during the last tick.
+        """
+        return self.released[key_index(key)] == 1
+
+    def get_events(self) -> List[Keydown]:
+        return list(self.held.values())
+
+
 class EventManager:
     """
     A class that manages events
+
+    Attributes:
+        source: The input source for this manager only, such as one client's input on a server. Defaults to the shared backend.
+        discard: Whether to drop added events instead of queueing them, for components that never read them.
     """
 
     def __init__(self) -> None:
-        self.inputmanager = InputManager()
         self.events = []
+        self.on_event: Callable[[], None] | None = None
+        self.source: InputSource | None = None
+        self.discard: bool = False
+
+    @property
+    def inputmanager(self) -> InputSource:
+        if self.source is not None:
+            return self.source
+        return GetInputBackend()
 
     def get(self):
-        e = self.events.copy()
+        inputs = self.inputmanager.get_events()
+        if not self.events:
+            return inputs
+
+        e = self.events
         self.events = []
-        return self.inputmanager.get_events() + e
+        return inputs + e
 
     def add_event(self, event: Event):
+        if self.discard:
+            return
+
         self.events.append(event)
 
+        if self.on_event is not None:
+            self.on_event()
+
@@ -0,0 +1,154 @@
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Tuple
+
+import pygame
+from utils import BaseObject, Color
+
+# A font is identified by its file (None for pygame's default font) and point size
+FontKey = Tuple[str | None, int]
+
+
+class CachedGlyph(BaseObject):
+    """
+    A single rendered character and how far to move along before drawing the next one.
+    """
+
+    def __init__(self, surface: pygame.surface.Surface, advance: int) -> None:
+        self.surface = surface
+        self.advance = advance
+
+    def __str__(self) -> str:
+        return f"CachedGlyph(size={self.surface.get_size()}, advance={self.advance})"
+
+
+class GlyphCache(BaseObject):
+    """
+    An LRU cache of rendered strings and glyphs.
+
+    `Font.render` is one of the most expensive pygame calls, so every string
+    and glyph is rendered once per font, size, colour and content and then
+    reused. Strings that change constantly (counters, timers) should be drawn
+    from glyphs instead, so only the handful of characters they use are ever
+    rendered. The cache is bounded by `budget` bytes; the least recently used
+    surfaces are dropped first.
+
+    Attributes:
+        budget: The maximum number of bytes of cached surfaces.
+    """
+
+    def __init__(self, budget: int = 8 * 1024 * 1024) -> None:
+        self.budget = budget
+
+        self.fonts: Dict[FontKey, pygame.font.Font] = {}
+        self.entries: OrderedDict[Hashable, pygame.surface.Surface | CachedGlyph] = OrderedDict()
+        self.memory = 0
+        self.hits = 0
+        self.misses = 0
+
+    def Font(self, name: str | None, size: int) -> pygame.font.Font:
+        """
+        Returns a loaded font, loading it the first time it's used.
+
+        Args:
+            name: A font file, or None for pygame's default font.
+            size: The point size.
+        """
+        key = (name, size)
+        font = self.fonts.get(key)
+        if font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            font = pygame.font.Font(name, size)
+            self.fonts[key] = font
+        return font
+
+    def String(self, font: FontKey, color: Color, text: str, antialias: bool = True) -> pygame.surface.Surface:
+        """
+        Returns a rendered string. It is shared and must not be modified.
+        """
+        key = ("string", font, color.rgb(), antialias, text)
+        surface = self._Lookup(key)
+        if surface is not None:
+            return surface
+
+        surface = self.Font(*font).render(text, antialias, color.rgb())
+        self._Store(key, surface)
+        return surface
+
+    def Glyph(self, font: FontKey, color: Color, char: str, antialias: bool = True) -> CachedGlyph:
+        """
+        Returns a rendered character. Its surface is shared and must not be modified.
+        """
+        key = ("glyph", font, color.rgb(), antialias, char)
+        glyph = self._Lookup(key)
+        if glyph is not None:
+            return glyph
+
+        loaded = self.Font(*font)
+        metrics = loaded.metrics(char)
+        surface = loaded.render(char, antialias, color.rgb())
+        advance = metrics[0][4] if metrics and metrics[0] is not None else surface.get_width()
+
+        glyph = CachedGlyph(surface, advance)
+        self._Store(key, glyph)
+        return glyph
+
+    def Glyphs(self, font: FontKey, color: Color, text: str, antialias: bool = True) -> Tuple[List[CachedGlyph], int, int]:
+        """
+        Returns the glyphs of a string with its total width and height.
+        """
+        glyphs = [self.Glyph(font, color, char, antialias) for char in text]
+        width = sum(glyph.advance for glyph in glyphs)
+        height = self.Font(*font).get_linesize()
+        return glyphs, width, height
+
+    def Clear(self) -> None:
+        self.entries.clear()
+        self.memory = 0
+
+    def Stats(self) -> dict:
+        return {
+            "fonts": len(self.fonts),
+            "entries": len(self.entries),
+            "bytes": self.memory,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _Lookup(self, key: Hashable):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def _Store(self, key: Hashable, entry: pygame.surface.Surface | CachedGlyph) -> None:
+        size = self._Size(entry)
+        if size > self.budget:
+            # Too big to keep, the caller uses it once
+            return
+
+        self.entries[key] = entry
+        self.memory += size
+        while self.memory > self.budget and self.entries:
+            _, dropped = self.entries.popitem(last=False)
+            self.memory -= self._Size(dropped)
+
+    def _Size(self, entry: pygame.surface.Surface | CachedGlyph) -> int:
+        surface = entry.surface if isinstance(entry, CachedGlyph) else entry
+        return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+    def __copy__(self) -> "GlyphCache":
+        return self
+
+    def __deepcopy__(self, memo) -> "GlyphCache":
+        return self
+
+    def __str__(self) -> str:
+        return f"GlyphCache(fonts={len(self.fonts)}, entries={len(self.entries)}, bytes={self.memory})"
+
+
+default_glyphs: GlyphCache = GlyphCache()
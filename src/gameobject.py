@@ -1,6 +1,7 @@
-from typing import List, Optional, Type
+import heapq
+from typing import List, Optional, Tuple, Type
 from base import BaseComponent
-from event import EventManager
+from event import EventManager, InputSource
 from logger import error
 from utils import BaseObject
 
@@ -9,6 +10,14 @@ class GameObject(BaseObject):
     def __init__(self) -> None:
         self.components: List[BaseComponent] = []
 
+        # Components with a real tick that are awake
+        self.ticking: List[BaseComponent] = []
+        # (wake tick, sleep number, order, component) for components sleeping on a timer
+        self.sleepers: List[Tuple[int, int, int, BaseComponent]] = []
+        self.ticks: int = 0
+        # Input source for every component, when it shouldn't use the shared backend
+        self.input: InputSource | None = None
+
     def AddComponent(self, comp: BaseComponent) -> None:
         """
         Adds a component to the GameObject
@@ -21,6 +30,10 @@ class GameObject(BaseObject):
         """
         if self.GetComponent(type(comp)) == None:
             self.components.append(comp)
+            comp._listener = self._ComponentChanged
+            if self.input is not None:
+                comp.eventmanager.source = self.input
+            self._ComponentChanged()
         else:
             error("Cannot add same component type to one GameObject")
 
@@ -43,19 +56,65 @@ class GameObject(BaseObject):
 
     def OnTick(self) -> None:
         """
-        Calls the OnTick method of all attached components.
+        Calls the OnTick method of all attached components that need ticking.
 
-        This method iterates through the `components` list of the GameObject and
+        This method iterates through the `ticking` list of the GameObject and
         calls the `OnTick` method of each component, passing the GameObject itself
-        as an argument. This allows components to update their state or perform
-        actions each game tick.
+        as an argument. Components without a tick of their own and sleeping
+        components are skipped; components whose sleep timer has run out are
+        woken first.
         """
-        for component in self.components:
+        self.UpdateSleepers()
+
+        for component in self.ticking:
             component.OnTick(self)
 
+    def UpdateSleepers(self) -> None:
+        """
+        Advances the GameObject's tick count and wakes components whose sleep timer has run out.
+        """
+        self.ticks += 1
+
+        while self.sleepers and self.sleepers[0][0] <= self.ticks:
+            _, sleeps, _, component = heapq.heappop(self.sleepers)
+            # Ignore timers from an earlier sleep the component was woken from
+            if component.sleeping and component._sleeps == sleeps:
+                component.Wake()
+
+    def SetInput(self, source: InputSource | None) -> None:
+        """
+        Makes every component of the GameObject read input from `source` instead of the shared backend.
+
+        Args:
+            source: The input source, e.g. a remote player's input. None goes back to the shared backend.
+        """
+        self.input = source
+        for comp in self.components:
+            comp.eventmanager.source = source
+
+    @property
+    def Active(self) -> bool:
+        """
+        Whether the GameObject has anything to do on a tick.
+        """
+        return bool(self.ticking or self.sleepers)
+
+    def _ComponentChanged(self) -> None:
+        self.ticking = [c for c in self.components if c.Ticks and not c.sleeping]
+
+        for c in self.components:
+            if c.sleeping and c._sleep_for is not None:
+                # `ticks` is the current tick; the component skips the next `_sleep_for` ticks
+                heapq.heappush(self.sleepers, (self.ticks + c._sleep_for + 1, c._sleeps, id(c), c))
+                c._sleep_for = None
+
     def __str__(self) -> str:
         l = self.__dict__.copy()
         l.pop("components") 
+        l.pop("ticking")
+        l.pop("sleepers")
+        l.pop("ticks")
+        l.pop("input")
         s = f"{self.__class__.__name__}({', '.join([f'{key}={value}' for key, value in l.items()])}"
 
         if self.components != []:
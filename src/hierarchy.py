@@ -0,0 +1,258 @@
+from array import array
+import math
+from typing import Any, List
+
+from utils import BaseObject, Position2d, Rotation2d
+
+
+class TransformHierarchy(BaseObject):
+    """
+    Parent/child relationships between transforms, with cached world positions.
+
+    Nodes are kept in topological order (every parent before its children) in
+    flat arrays. Changing a transform only marks it dirty; `Update` then
+    recomputes every dirty node and everything below it in a single pass over
+    the arrays, so moving a parent with many children costs one pass rather
+    than one update per child.
+
+    Any object with a `pos` attribute (usually a `Transform`) can be a node.
+    Local positions are relative to the parent's world position and rotated
+    by its world rotation (clockwise, matching sprite rotation).
+    """
+
+    def __init__(self) -> None:
+        self.nodes: List[Any] = []
+        self.parent = array("i")
+
+        self.wx = array("d")
+        self.wy = array("d")
+        self.wrot = array("d")
+
+        self.dirty = bytearray()
+        self.world: List[Position2d | None] = []
+
+        self.pending: bool = False
+        self._order_dirty: bool = False
+
+    def Add(self, node: Any) -> int:
+        """
+        Adds a node as a root, returning its index. Adding a node twice returns its existing index.
+        """
+        if getattr(node, "_hierarchy", None) is self:
+            return node._node
+
+        index = len(self.nodes)
+        self.nodes.append(node)
+        self.parent.append(-1)
+        self.wx.append(0)
+        self.wy.append(0)
+        self.wrot.append(0)
+        self.dirty.append(1)
+        self.world.append(None)
+
+        node._hierarchy = self
+        node._node = index
+        self.pending = True
+        return index
+
+    def SetParent(self, node: Any, parent: Any | None) -> None:
+        """
+        Attaches a node to a parent, or detaches it (making it a root) when `parent` is None.
+        """
+        child = self.Add(node)
+
+        if parent is None:
+            self.parent[child] = -1
+        else:
+            index = self.Add(parent)
+            ancestor = index
+            while ancestor != -1:
+                if ancestor == child:
+                    raise Exception("A transform cannot be parented to one of its descendants")
+                ancestor = self.parent[ancestor]
+
+            self.parent[child] = index
+            if index > child:
+                self._order_dirty = True
+
+        self.MarkDirty(node)
+
+    def Remove(self, node: Any) -> None:
+        """
+        Stops tracking a node. Its children become roots at their current world positions.
+        """
+        self.RemoveMany([node])
+
+    def RemoveMany(self, nodes: List[Any]) -> None:
+        """
+        Stops tracking several nodes in a single pass over the arrays.
+
+        Children of a removed node become roots, keeping their current world
+        position so they don't jump. Nodes that aren't in the hierarchy are ignored.
+        """
+        nodes = [node for node in nodes if getattr(node, "_hierarchy", None) is self]
+        if not nodes:
+            return
+
+        # World positions are needed to turn orphaned children into roots. Updating may reorder the
+        # arrays, so the indices of the removed nodes are only read afterwards
+        self.Update()
+
+        removing = bytearray(len(self.nodes))
+        for node in nodes:
+            removing[node._node] = 1
+
+        new_index = [-1] * len(self.nodes)
+        keep: List[int] = []
+        for i in range(len(self.nodes)):
+            if removing[i]:
+                node = self.nodes[i]
+                node._hierarchy = None
+                node._node = -1
+            else:
+                new_index[i] = len(keep)
+                keep.append(i)
+
+        parent = array("i")
+        for i in keep:
+            p = self.parent[i]
+            if p != -1 and removing[p]:
+                self.nodes[i].pos = Position2d(self.wx[i], self.wy[i], Rotation2d(self.wrot[i]))
+                self.dirty[i] = 1
+                p = -1
+            parent.append(new_index[p] if p != -1 else -1)
+
+        # Keeping the old order keeps parents before their children
+        self.nodes = [self.nodes[i] for i in keep]
+        self.parent = parent
+        self.wx = array("d", [self.wx[i] for i in keep])
+        self.wy = array("d", [self.wy[i] for i in keep])
+        self.wrot = array("d", [self.wrot[i] for i in keep])
+        self.dirty = bytearray(self.dirty[i] for i in keep)
+        self.world = [self.world[i] for i in keep]
+
+        for i, node in enumerate(self.nodes):
+            node._node = i
+
+        self.pending = any(self.dirty)
+
+    def Parent(self, node: Any) -> Any | None:
+        if getattr(node, "_hierarchy", None) is not self:
+            return None
+        index = self.parent[node._node]
+        return self.nodes[index] if index != -1 else None
+
+    def Children(self, node: Any) -> List[Any]:
+        if getattr(node, "_hierarchy", None) is not self:
+            return []
+        return [self.nodes[i] for i, p in enumerate(self.parent) if p == node._node]
+
+    def MarkDirty(self, node: Any) -> None:
+        self.dirty[node._node] = 1
+        self.pending = True
+
+    def WorldPos(self, node: Any) -> Position2d:
+        """
+        Returns the cached world position of a node, updating the hierarchy first if anything changed.
+
+        The returned position is shared with later calls and must not be modified.
+        """
+        if self.pending:
+            self.Update()
+
+        i = node._node
+        pos = self.world[i]
+        if pos is None:
+            pos = Position2d(self.wx[i], self.wy[i], Rotation2d(self.wrot[i]))
+            self.world[i] = pos
+        return pos
+
+    def Update(self) -> None:
+        """
+        Recomputes the world position of every dirty node and its descendants in one pass.
+        """
+        if not self.pending:
+            return
+
+        if self._order_dirty:
+            self._Reorder()
+
+        parent = self.parent
+        wx, wy, wrot = self.wx, self.wy, self.wrot
+        dirty = self.dirty
+        world = self.world
+        nodes = self.nodes
+        changed = bytearray(len(nodes))
+
+        for i in range(len(nodes)):
+            p = parent[i]
+            if not dirty[i] and (p == -1 or not changed[p]):
+                continue
+
+            local = nodes[i].pos
+            if p == -1:
+                wx[i] = local.x
+                wy[i] = local.y
+                wrot[i] = local.rot.x % 360
+            else:
+                angle = math.radians(wrot[p])
+                c = math.cos(angle)
+                s = math.sin(angle)
+                wx[i] = wx[p] + local.x * c - local.y * s
+                wy[i] = wy[p] + local.x * s + local.y * c
+                wrot[i] = (wrot[p] + local.rot.x) % 360
+
+            world[i] = None
+            changed[i] = 1
+
+        self.dirty = bytearray(len(nodes))
+        self.pending = False
+
+    def _Reorder(self) -> None:
+        """
+        Restores topological order after a node was parented to one that came after it.
+        """
+        count = len(self.nodes)
+        children: List[List[int]] = [[] for _ in range(count)]
+        roots: List[int] = []
+        for i in range(count):
+            if self.parent[i] == -1:
+                roots.append(i)
+            else:
+                children[self.parent[i]].append(i)
+
+        order: List[int] = []
+        stack = list(reversed(roots))
+        while stack:
+            i = stack.pop()
+            order.append(i)
+            stack.extend(reversed(children[i]))
+
+        new_index = [0] * count
+        for new, old in enumerate(order):
+            new_index[old] = new
+
+        self.nodes = [self.nodes[old] for old in order]
+        self.parent = array("i", [new_index[self.parent[old]] if self.parent[old] != -1 else -1 for old in order])
+        self.wx = array("d", [self.wx[old] for old in order])
+        self.wy = array("d", [self.wy[old] for old in order])
+        self.wrot = array("d", [self.wrot[old] for old in order])
+        self.dirty = bytearray(self.dirty[old] for old in order)
+        self.world = [self.world[old] for old in order]
+
+        for i, node in enumerate(self.nodes):
+            node._node = i
+
+        self._order_dirty = False
+
+    def __eq__(self, other) -> bool:
+        return self is other
+
+    def __hash__(self) -> int:
+        return id(self)
+
+    def __str__(self) -> str:
+        return f"TransformHierarchy(nodes={len(self.nodes)})"
+
+
+default_hierarchy: TransformHierarchy = TransformHierarchy()
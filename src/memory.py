@@ -0,0 +1,312 @@
+from dataclasses import dataclass, field
+import gc
+import logging
+import sys
+import threading
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from atlas import default_atlas
+from components import Model, Transform, VelocityControl
+from event import KeyState, SetInputBackend
+from fonts import default_glyphs
+from gameobject import GameObject
+from hierarchy import default_hierarchy
+from logger import debug, error, logger
+from sprite import Square
+from transformcache import default_cache
+from utils import Color, Position2d, Rotation2d, SquareSize
+
+
+@dataclass
+class ComponentUsage:
+    """
+    The memory used by every component of one type.
+
+    Attributes:
+        count: The number of components.
+        bytes: The shallow size of the components, their attribute and `_state` dicts and their EventManagers.
+        queued_events: The number of events waiting in their EventManagers.
+    """
+
+    count: int = 0
+    bytes: int = 0
+    queued_events: int = 0
+
+
+@dataclass
+class MemoryReport:
+    """
+    A breakdown of the memory an engine is holding on to.
+
+    Sizes are shallow (`sys.getsizeof`) for Python objects and exact for
+    cached surfaces, so they show where memory grows rather than the process
+    total.
+
+    Attributes:
+        objects: The number of GameObjects in the engine.
+        components: Component type name -> usage.
+        caches: Cache name -> the cache's stats, including its size in bytes.
+        subsystems: Subsystem name -> counters describing what it holds.
+        threads: Thread name prefix -> the number of live threads.
+    """
+
+    objects: int = 0
+    components: Dict[str, ComponentUsage] = field(default_factory=dict)
+    caches: Dict[str, dict] = field(default_factory=dict)
+    subsystems: Dict[str, dict] = field(default_factory=dict)
+    threads: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def thread_count(self) -> int:
+        return sum(self.threads.values())
+
+    def Format(self) -> str:
+        lines = [f"Objects: {self.objects}", "Components:"]
+        for name, usage in sorted(self.components.items(), key=lambda item: -item[1].bytes):
+            lines.append(f"  {name}: {usage.count} using {usage.bytes} bytes, {usage.queued_events} queued events")
+        lines.append("Caches:")
+        for name, stats in self.caches.items():
+            lines.append(f"  {name}: {stats}")
+        lines.append("Subsystems:")
+        for name, stats in self.subsystems.items():
+            lines.append(f"  {name}: {stats}")
+        lines.append(f"Threads: {self.thread_count} {self.threads}")
+        return "\n".join(lines)
+
+
+def _ComponentSize(comp: Any) -> int:
+    size = sys.getsizeof(comp) + sys.getsizeof(comp.__dict__) + sys.getsizeof(comp._state)
+    manager = comp.eventmanager
+    size += sys.getsizeof(manager) + sys.getsizeof(manager.__dict__) + sys.getsizeof(manager.events)
+    return size
+
+
+def _ThreadName(thread: threading.Thread) -> str:
+    # Pool threads are named like "assets_0"; group them by prefix
+    return thread.name.rsplit("_", 1)[0] if thread.name[-1:].isdigit() else thread.name
+
+
+def Report(engine: Any) -> MemoryReport:
+    """
+    Measures the memory held by an engine's objects, the shared sprite caches and each subsystem.
+    """
+    report = MemoryReport(objects=len(engine.gameobjects))
+
+    for g in engine.gameobjects:
+        for comp in g.components:
+            usage = report.components.setdefault(type(comp).__name__, ComponentUsage())
+            usage.count += 1
+            usage.bytes += _ComponentSize(comp)
+            usage.queued_events += len(comp.eventmanager.events)
+
+    report.caches["atlas"] = default_atlas.Stats()
+    report.caches["transform"] = default_cache.Stats()
+    report.caches["glyphs"] = default_glyphs.Stats()
+
+    report.subsystems["timers"] = {"pending": engine.timers.count, "owners": len(engine.timers.owners)}
+    report.subsystems["tasks"] = {"running": engine.tasks.count, "owners": len(engine.tasks.owners)}
+    report.subsystems["hierarchy"] = {"nodes": len(default_hierarchy.nodes)}
+    report.subsystems["assets"] = {"handles": len(engine.assets.handles), "pending": len(engine.assets.pending)}
+    report.subsystems["streaming"] = {
+        "streamers": len(engine.streamers),
+        "resident": sum(streamer.resident for streamer in engine.streamers),
+    }
+    if engine.scheduler is not None:
+        report.subsystems["scheduler"] = {"systems": len(engine.scheduler.systems)}
+    if engine.server is not None:
+        report.subsystems["server"] = {
+            "clients": len(engine.server.clients),
+            "history": len(engine.server.history),
+            "ids": len(engine.server.ids),
+        }
+    if engine.renderer is not None:
+        capture = engine.renderer.capture
+        report.subsystems["renderer"] = {
+            "views": len(engine.renderer.views),
+            "capture_bytes": sum(shm.size for shm in capture.slots) if capture is not None else 0,
+        }
+    report.subsystems["logger"] = {"handlers": len(logger.handlers)}
+
+    for thread in threading.enumerate():
+        name = _ThreadName(thread)
+        report.threads[name] = report.threads.get(name, 0) + 1
+
+    return report
+
+
+@dataclass
+class SoakSample:
+    tick: int
+    objects: int
+    bytes: int
+    threads: int
+
+
+@dataclass
+class SoakResult:
+    """
+    The outcome of a soak run.
+
+    Attributes:
+        passed: Whether retained memory and thread count stayed flat.
+        reason: Why the run failed, if it did.
+        samples: The measurements taken during the run.
+        growth: The largest allocation sites that grew over the run, as tracemalloc statistics lines.
+        report: The memory report at the end of the run.
+    """
+
+    passed: bool
+    reason: str
+    samples: List[SoakSample]
+    growth: List[str]
+    report: MemoryReport
+
+
+def SoakObject(engine: Any, n: int) -> GameObject:
+    """
+    The default object created by `Soak`: a moving square with a timer owned by it.
+    """
+    g = GameObject()
+    g.AddComponent(Transform(Position2d(n % 1000, n // 1000, Rotation2d(0))))
+    g.AddComponent(VelocityControl(g, 1))
+    g.AddComponent(Model(g, Square(SquareSize(8), Color(n % 256, 0, 0))))
+    engine.Schedule(1, lambda: None, True, g)
+    return g
+
+
+def Soak(
+    ticks: int = 60 * 60 * 60,
+    population: int = 500,
+    churn: int = 10,
+    sample_every: int = 1000,
+    spawn: Callable[[Any, int], GameObject] | None = None,
+    tolerance: int = 1024 * 1024,
+    engine: Any = None
+) -> SoakResult:
+    """
+    Runs a headless engine with constant entity churn and checks that memory and threads stay flat.
+
+    Every tick `churn` of the oldest objects are removed and as many new ones
+    added, keeping `population` objects alive. Ticks run back to back without
+    frame pacing, so an hour of simulated ticks takes far less wall time.
+    Every `sample_every` ticks the traced memory (after a collection) and the
+    thread count are recorded. The first quarter of the samples is treated
+    as warm-up; the run fails if the smallest sample in the last third of the
+    rest is still above the largest in the first third (by more than
+    `tolerance` bytes for memory), i.e. if usage kept growing.
+
+    Args:
+        ticks: The number of ticks to run. Defaults to an hour at 60 ticks per second.
+        population: The number of live objects.
+        churn: The number of objects replaced every tick.
+        sample_every: The number of ticks between samples.
+        spawn: Creates an object given the engine and a counter. Defaults to `SoakObject`.
+        tolerance: The growth in bytes allowed between the start and end of the run.
+        engine: The engine to soak. Defaults to a new headless engine reading input from a `KeyState`, which
+            only replaces the shared input backend for the duration of the run.
+    """
+    owned = engine is None
+    backend = None
+    if engine is None:
+        from renderer import Engine
+
+        # The engine makes its input the shared backend; keep the previous one to put back afterwards
+        keys = KeyState()
+        backend = SetInputBackend(keys)
+        engine = Engine(headless=True, input=keys)
+    if spawn is None:
+        spawn = SoakObject
+
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+
+    # Debug logging of every churned object would dominate the measurements
+    level = logger.level
+    logger.setLevel(logging.WARNING)
+
+    spawned = 0
+    for _ in range(population):
+        engine.AddObject(spawn(engine, spawned), len(engine.gameobjects))
+        spawned += 1
+
+    samples: List[SoakSample] = []
+    baseline: tracemalloc.Snapshot | None = None
+    warmup = max(1, ticks // sample_every // 4)
+
+    try:
+        for tick in range(1, ticks + 1):
+            if churn:
+                engine.RemoveObjects(engine.gameobjects[:churn])
+                for _ in range(churn):
+                    engine.AddObject(spawn(engine, spawned), len(engine.gameobjects))
+                    spawned += 1
+
+            engine.Step()
+
+            if tick % sample_every == 0:
+                gc.collect()
+                samples.append(SoakSample(tick, len(engine.gameobjects), tracemalloc.get_traced_memory()[0], threading.active_count()))
+                if len(samples) == warmup:
+                    baseline = tracemalloc.take_snapshot()
+
+        gc.collect()
+        growth: List[str] = []
+        if baseline is not None:
+            stats = tracemalloc.take_snapshot().compare_to(baseline, "lineno")
+            growth = [str(stat) for stat in stats[:10] if stat.size_diff > 0]
+    finally:
+        logger.setLevel(level)
+        if owned:
+            SetInputBackend(backend)
+        if started:
+            tracemalloc.stop()
+
+    passed, reason = _Flat(samples[warmup:], tolerance)
+    result = SoakResult(passed, reason, samples, growth, Report(engine))
+
+    if passed:
+        debug(f"Soak passed after {ticks} ticks and {spawned} objects")
+    else:
+        error(f"Soak failed after {ticks} ticks: {reason}")
+    return result
+
+
+def _Flat(samples: List[SoakSample], tolerance: int) -> Tuple[bool, str]:
+    if len(samples) < 3:
+        return True, "Too few samples to detect growth"
+
+    third = len(samples) // 3
+    first, last = samples[:third], samples[-third:]
+
+    start = max(s.bytes for s in first)
+    end = min(s.bytes for s in last)
+    if end > start + tolerance:
+        return False, f"Retained memory grew from {start} to {end} bytes"
+
+    start = max(s.threads for s in first)
+    end = min(s.threads for s in last)
+    if end > start:
+        return False, f"Thread count grew from {start} to {end}"
+
+    return True, ""
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Runs a headless soak test and fails if memory or threads keep growing")
+    parser.add_argument("--ticks", type=int, default=60 * 60 * 60)
+    parser.add_argument("--population", type=int, default=500)
+    parser.add_argument("--churn", type=int, default=10)
+    parser.add_argument("--sample-every", type=int, default=1000)
+    args = parser.parse_args()
+
+    result = Soak(args.ticks, args.population, args.churn, args.sample_every)
+    print(result.report.Format())
+    for line in result.growth:
+        print(line)
+    if not result.passed:
+        print(result.reason)
+        sys.exit(1)
@@ -0,0 +1,247 @@
+from array import array
+from collections import OrderedDict
+import heapq
+import math
+from typing import List, Tuple
+
+from base import BaseComponent
+from components import RequireComponent, Transform, Velocity, VelocityControl
+from gameobject import GameObject
+from logger import debug
+from utils import BaseObject, Position2d
+
+UNREACHABLE: int = -1
+# Stored in a direction cell that has nowhere to go: the goal itself or an unreachable cell
+NO_DIRECTION: int = -1
+
+# (dx, dy, direction in degrees, cost): directions follow Velocity, 0 is up (-y) and 90 is right (+x)
+NEIGHBOURS: List[Tuple[int, int, int, int]] = [
+    (0, -1, 0, 10),
+    (1, -1, 45, 14),
+    (1, 0, 90, 10),
+    (1, 1, 135, 14),
+    (0, 1, 180, 10),
+    (-1, 1, 225, 14),
+    (-1, 0, 270, 10),
+    (-1, -1, 315, 14),
+]
+
+
+class NavGrid(BaseObject):
+    """
+    A grid of walkable cells covering part of the world.
+
+    Args:
+        width: The number of columns.
+        height: The number of rows.
+        cell_size: The size of a cell in world units.
+        origin: The world position of the top left corner of cell (0, 0).
+
+    Attributes:
+        version: Incremented whenever a cell changes, so cached flow fields know to recompute.
+    """
+
+    def __init__(self, width: int, height: int, cell_size: float = 32, origin: Tuple[float, float] = (0, 0)) -> None:
+        self.width = width
+        self.height = height
+        self.cell_size = cell_size
+        self.origin = origin
+
+        self.blocked = bytearray(width * height)
+        # Extra cost of entering each cell, on top of the move cost. None until a cost is set
+        self.costs: bytearray | None = None
+        self.version = 0
+
+    def Index(self, cx: int, cy: int) -> int:
+        return cy * self.width + cx
+
+    def Contains(self, cx: int, cy: int) -> bool:
+        return 0 <= cx < self.width and 0 <= cy < self.height
+
+    def CellAt(self, pos: Position2d) -> Tuple[int, int]:
+        return (
+            math.floor((pos.x - self.origin[0]) / self.cell_size),
+            math.floor((pos.y - self.origin[1]) / self.cell_size),
+        )
+
+    def CellCenter(self, cx: int, cy: int) -> Tuple[float, float]:
+        return (
+            self.origin[0] + (cx + 0.5) * self.cell_size,
+            self.origin[1] + (cy + 0.5) * self.cell_size,
+        )
+
+    def SetBlocked(self, cx: int, cy: int, blocked: bool = True) -> None:
+        self.blocked[self.Index(cx, cy)] = 1 if blocked else 0
+        self.version += 1
+
+    def SetCost(self, cx: int, cy: int, cost: int) -> None:
+        """
+        Sets the extra cost (0-255) of entering a cell, e.g. for rough terrain.
+        """
+        if self.costs is None:
+            self.costs = bytearray(self.width * self.height)
+        self.costs[self.Index(cx, cy)] = cost
+        self.version += 1
+
+    def __str__(self) -> str:
+        return f"NavGrid(width={self.width}, height={self.height}, cell_size={self.cell_size}, version={self.version})"
+
+
+class FlowField(BaseObject):
+    """
+    The direction to move in from every cell of a grid to reach one goal cell.
+
+    Attributes:
+        goal: The goal cell.
+        version: The grid version the field was computed for.
+        distance: The cost to reach the goal from each cell, or `UNREACHABLE`.
+        direction: The direction in degrees to move from each cell, or `NO_DIRECTION`.
+    """
+
+    def __init__(self, grid: NavGrid, goal: Tuple[int, int]) -> None:
+        self.grid = grid
+        self.goal = goal
+        self.version = grid.version
+
+        count = grid.width * grid.height
+        self.distance = array("i", [UNREACHABLE]) * count
+        self.direction = array("h", [NO_DIRECTION]) * count
+
+        if grid.Contains(*goal) and not grid.blocked[grid.Index(*goal)]:
+            self._Search()
+
+    def Direction(self, cx: int, cy: int) -> int:
+        if not self.grid.Contains(cx, cy):
+            return NO_DIRECTION
+        return self.direction[cy * self.grid.width + cx]
+
+    def _Search(self) -> None:
+        # A uniform-cost search outwards from the goal over the same 8 neighbours (without cutting corners
+        # past blocked cells) whether or not the grid has costs. Each cell's direction is recorded when its
+        # distance improves: it points back at the cell it was reached from, so no second pass is needed
+        grid = self.grid
+        width = grid.width
+        height = grid.height
+        blocked = grid.blocked
+        costs = grid.costs
+        distance = self.distance
+        direction = self.direction
+        # (dx, dy, index offset, direction back towards the cell being expanded, move cost)
+        moves = [(dx, dy, dy * width + dx, (degrees + 180) % 360, cost) for dx, dy, degrees, cost in NEIGHBOURS]
+
+        start = grid.Index(*self.goal)
+        distance[start] = 0
+        heap = [(0, start)]
+        while heap:
+            d, index = heapq.heappop(heap)
+            if d > distance[index]:
+                continue
+            cx, cy = index % width, index // width
+            for dx, dy, offset, back, cost in moves:
+                nx, ny = cx + dx, cy + dy
+                if nx < 0 or nx >= width or ny < 0 or ny >= height:
+                    continue
+                n = index + offset
+                if blocked[n]:
+                    continue
+                if dx and dy and (blocked[index + dx] or blocked[index + dy * width]):
+                    continue
+                nd = d + cost
+                if costs is not None:
+                    nd += costs[n]
+                if distance[n] == UNREACHABLE or nd < distance[n]:
+                    distance[n] = nd
+                    direction[n] = back
+                    heapq.heappush(heap, (nd, n))
+
+    def __str__(self) -> str:
+        return f"FlowField(goal={self.goal}, version={self.version})"
+
+
+class Navigation(BaseObject):
+    """
+    Computes flow fields for a grid and caches them per goal.
+
+    A field is computed once per goal and reused by every agent heading
+    there, until the grid changes. The least recently used fields are dropped
+    once more than `max_fields` goals are cached.
+    """
+
+    def __init__(self, grid: NavGrid, max_fields: int = 16) -> None:
+        self.grid = grid
+        self.max_fields = max_fields
+        self.fields: OrderedDict[Tuple[int, int], FlowField] = OrderedDict()
+        self.version = grid.version
+        self.computed = 0
+
+    def Field(self, goal: Tuple[int, int]) -> FlowField:
+        """
+        Returns the flow field towards a goal cell, computing it if needed.
+        """
+        if self.version != self.grid.version:
+            # The obstacles changed, so every cached field is stale
+            self.fields.clear()
+            self.version = self.grid.version
+
+        field = self.fields.get(goal)
+        if field is not None:
+            self.fields.move_to_end(goal)
+            return field
+
+        field = FlowField(self.grid, goal)
+        self.computed += 1
+        self.fields[goal] = field
+        while len(self.fields) > self.max_fields:
+            self.fields.popitem(last=False)
+
+        debug(f"Computed flow field towards {goal}")
+        return field
+
+    def FieldTo(self, pos: Position2d) -> FlowField:
+        return self.Field(self.grid.CellAt(pos))
+
+    def Direction(self, pos: Position2d, field: FlowField) -> int:
+        """
+        Returns the direction to move in from a world position, or `NO_DIRECTION`.
+        """
+        cx, cy = self.grid.CellAt(pos)
+        return field.Direction(cx, cy)
+
+    def __str__(self) -> str:
+        return f"Navigation(grid={self.grid}, fields={len(self.fields)})"
+
+
+class NavAgent(BaseComponent):
+    """
+    Steers a GameObject towards a goal by sampling a shared flow field.
+
+    Each tick costs one cell lookup; the path itself is computed once per goal
+    by `Navigation` for all agents heading there.
+    """
+
+    def __init__(self, obj: GameObject, navigation: Navigation, goal: Position2d, speed: float = 1) -> None:
+        super().__init__(self._tick)
+
+        self.navigation: Navigation = navigation
+        self.goal: Position2d = goal
+        self._state["speed"] = speed
+
+        RequireComponent(obj, VelocityControl, VelocityControl(obj))
+
+    def SetGoal(self, goal: Position2d) -> None:
+        self.goal = goal
+        self.Wake()
+
+    def _tick(self, entity: GameObject, events) -> None:
+        velcontrol = entity.GetComponent(VelocityControl)
+        transform = entity.GetComponent(Transform)
+        if not isinstance(velcontrol, VelocityControl) or not isinstance(transform, Transform):
+            return
+
+        field = self.navigation.FieldTo(self.goal)
+        direction = self.navigation.Direction(transform.GetPos(), field)
+
+        if direction == NO_DIRECTION:
+            velcontrol.SetVelocity(Velocity(0, 0), False)
+        else:
+            velcontrol.SetVelocity(Velocity(self._state["speed"], direction), False)
@@ -0,0 +1,704 @@
+from array import array
+from collections import OrderedDict
+import socket
+import struct
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from components import Transform, VelocityControl
+from event import InputSource, Keydown, GetInputBackend
+from gameobject import GameObject
+from logger import debug, warning
+from utils import BaseObject, Position2d, Rotation2d
+
+MSG_HELLO: int = 1
+MSG_WELCOME: int = 2
+MSG_INPUT: int = 3
+MSG_STATE: int = 4
+MSG_BYE: int = 5
+
+# Replicated values, sent as int32 multiples of 1 / scale
+FIELDS: List[Tuple[str, int]] = [
+    ("x", 16),
+    ("y", 16),
+    ("rot", 64),
+    ("speed", 16),
+    ("direction", 64),
+]
+
+NO_TICK: int = 0xFFFFFFFF
+# Keep datagrams under a typical MTU so they are never fragmented
+MAX_PAYLOAD: int = 1200
+# Ticks of state kept to delta against
+HISTORY: int = 64
+
+TYPE = struct.Struct("<B")
+WELCOME = struct.Struct("<BIII")
+# type, client, tick, ack, key count
+INPUT = struct.Struct("<BIIIB")
+# type, tick, base tick, chunk, chunks, removed, records
+STATE = struct.Struct("<BIIHHHH")
+RECORD = struct.Struct("<IB")
+ID = struct.Struct("<I")
+VALUE = struct.Struct("<i")
+
+
+class NetState(BaseObject):
+    """
+    The quantized replicated state of every object on one tick.
+
+    Attributes:
+        tick: The tick the state is for.
+        rows: Network id -> one quantized value per entry of `FIELDS`.
+    """
+
+    def __init__(self, tick: int, rows: Dict[int, array] | None = None) -> None:
+        self.tick = tick
+        self.rows: Dict[int, array] = rows if rows is not None else {}
+
+    def Copy(self, tick: int) -> "NetState":
+        return NetState(tick, {net_id: array("i", row) for net_id, row in self.rows.items()})
+
+    def __str__(self) -> str:
+        return f"NetState(tick={self.tick}, entities={len(self.rows)})"
+
+
+def EncodeState(state: NetState, base: NetState | None) -> List[bytes]:
+    """
+    Encodes a state as datagrams, sending only the values that differ from `base`.
+
+    Each datagram is at most `MAX_PAYLOAD` bytes. A receiver has the state
+    once it has every chunk and the base.
+    """
+    removed: List[int] = []
+    records: List[bytes] = []
+    base_rows = base.rows if base is not None else {}
+
+    for net_id in base_rows:
+        if net_id not in state.rows:
+            removed.append(net_id)
+
+    for net_id, row in state.rows.items():
+        old = base_rows.get(net_id)
+        mask = 0
+        values: List[bytes] = []
+        for f in range(len(FIELDS)):
+            if old is None or old[f] != row[f]:
+                mask |= 1 << f
+                values.append(VALUE.pack(row[f]))
+        if mask:
+            records.append(RECORD.pack(net_id, mask) + b"".join(values))
+
+    base_tick = base.tick if base is not None else NO_TICK
+
+    # Removals go in the first chunk, then records fill chunks up to the payload size
+    chunks: List[Tuple[List[int], List[bytes]]] = [([], [])]
+    size = STATE.size
+    for net_id in removed:
+        if size + ID.size > MAX_PAYLOAD:
+            chunks.append(([], []))
+            size = STATE.size
+        chunks[-1][0].append(net_id)
+        size += ID.size
+    for record in records:
+        if size + len(record) > MAX_PAYLOAD:
+            chunks.append(([], []))
+            size = STATE.size
+        chunks[-1][1].append(record)
+        size += len(record)
+
+    return [
+        STATE.pack(MSG_STATE, state.tick, base_tick, i, len(chunks), len(ids), len(recs))
+        + b"".join(ID.pack(net_id) for net_id in ids)
+        + b"".join(recs)
+        for i, (ids, recs) in enumerate(chunks)
+    ]
+
+
+def DecodeState(base: NetState | None, tick: int, chunks: List[bytes]) -> NetState:
+    """
+    Rebuilds a state from its base and every chunk encoded for it.
+    """
+    state = base.Copy(tick) if base is not None else NetState(tick)
+    for data in chunks:
+        _, _, _, _, _, removed, count = STATE.unpack_from(data, 0)
+        offset = STATE.size
+        for _ in range(removed):
+            (net_id,) = ID.unpack_from(data, offset)
+            offset += ID.size
+            state.rows.pop(net_id, None)
+        for _ in range(count):
+            net_id, mask = RECORD.unpack_from(data, offset)
+            offset += RECORD.size
+            row = state.rows.get(net_id)
+            if row is None:
+                row = array("i", [0]) * len(FIELDS)
+                state.rows[net_id] = row
+            for f in range(len(FIELDS)):
+                if mask & (1 << f):
+                    (row[f],) = VALUE.unpack_from(data, offset)
+                    offset += VALUE.size
+    return state
+
+
+class RemoteInput(InputSource):
+    """
+    The keys a remote client reports as held, used in place of the local keyboard for that client's objects.
+    """
+
+    def __init__(self) -> None:
+        self.held: List[Keydown] = []
+        self._events: Dict[str, Keydown] = {}
+        self.tick: int = -1
+
+    def Set(self, tick: int, keys: List[str]) -> None:
+        """
+        Updates the held keys from an input message, ignoring messages older than the last one.
+        """
+        if tick <= self.tick:
+            return
+        self.tick = tick
+
+        held = []
+        for key in keys:
+            e = self._events.get(key)
+            if e is None:
+                e = Keydown(1, key)
+                self._events[key] = e
+            held.append(e)
+        self.held = held
+
+    def get_events(self) -> List[Keydown]:
+        return self.held
+
+
+class RemoteClient(BaseObject):
+    """
+    A client connected to a `NetServer`.
+
+    Attributes:
+        id: The client's id.
+        address: The client's address.
+        input: The client's held keys.
+        ack: The newest tick the client has confirmed it has, or `NO_TICK`.
+        entity: The object the client controls, if any.
+    """
+
+    def __init__(self, id: int, address: Tuple[str, int]) -> None:
+        self.id = id
+        self.address = address
+        self.input = RemoteInput()
+        self.ack: int = NO_TICK
+        self.entity: GameObject | None = None
+        self.last_seen: float = time.monotonic()
+
+    def __eq__(self, other) -> bool:
+        return self is other
+
+    def __hash__(self) -> int:
+        return self.id
+
+    def __str__(self) -> str:
+        return f"RemoteClient(id={self.id}, address={self.address}, ack={self.ack})"
+
+
+class NetServer(BaseObject):
+    """
+    Runs an engine as the authority for remote clients over UDP.
+
+    Every tick the engine calls `Receive` before updating objects and
+    `Broadcast` afterwards. Each object with a `Transform` is replicated:
+    its world position and `VelocityControl` velocity are quantized (see
+    `FIELDS`) and every client is sent only the values that changed since
+    the last state it acknowledged. Clients that haven't acknowledged a
+    recent state get a full one.
+
+    Args:
+        engine: The engine to replicate.
+        port: The UDP port to listen on. 0 picks a free port; see `address`.
+        host: The interface to listen on.
+        on_join: Called with each new client. May return the object the client controls; it is added to the
+            engine if needed and reads the client's input.
+        on_leave: Called when a client leaves or times out. Defaults to removing the client's object.
+        rate: Send state every N ticks.
+        timeout: Seconds without a message before a client is dropped.
+    """
+
+    def __init__(
+        self,
+        engine: Any,
+        port: int = 0,
+        host: str = "127.0.0.1",
+        on_join: Callable[[RemoteClient], GameObject | None] | None = None,
+        on_leave: Callable[[RemoteClient], None] | None = None,
+        rate: int = 1,
+        timeout: float = 5
+    ) -> None:
+        self.engine = engine
+        self.on_join = on_join
+        self.on_leave = on_leave
+        self.rate = max(1, rate)
+        self.timeout = timeout
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((host, port))
+        self.socket.setblocking(False)
+        self.address: Tuple[str, int] = self.socket.getsockname()
+
+        self.clients: Dict[Tuple[str, int], RemoteClient] = {}
+        self.history: OrderedDict[int, NetState] = OrderedDict()
+
+        # id(object) -> network id, and the objects themselves so ids aren't reused while they are known
+        self.ids: Dict[int, int] = {}
+        self.objects: Dict[int, GameObject] = {}
+        self._next_client = 1
+        self._next_id = 1
+
+        self.sent: int = 0
+
+        debug(f"Serving on {self.address[0]}:{self.address[1]}")
+
+    def NetId(self, obj: GameObject) -> int:
+        """
+        Returns the network id of an object, assigning one if needed.
+        """
+        net_id = self.ids.get(id(obj))
+        if net_id is None:
+            net_id = self._next_id
+            self._next_id += 1
+            self.ids[id(obj)] = net_id
+            self.objects[net_id] = obj
+        return net_id
+
+    def Receive(self) -> None:
+        """
+        Handles every waiting client message and drops clients that timed out.
+        """
+        now = time.monotonic()
+        while True:
+            try:
+                data, address = self.socket.recvfrom(65536)
+            except (BlockingIOError, InterruptedError):
+                break
+            except ConnectionResetError:
+                continue
+
+            if not data:
+                continue
+
+            kind = data[0]
+            client = self.clients.get(address)
+            if kind == MSG_HELLO:
+                if client is None:
+                    client = self._Join(address)
+                self._Welcome(client)
+            elif client is None:
+                continue
+            elif kind == MSG_INPUT:
+                self._Input(client, data)
+            elif kind == MSG_BYE:
+                self._Leave(client)
+                continue
+
+            if client is not None:
+                client.last_seen = now
+
+        for client in [c for c in self.clients.values() if now - c.last_seen > self.timeout]:
+            warning(f"Client {client.id} timed out")
+            self._Leave(client)
+
+    def Capture(self, tick: int) -> NetState:
+        """
+        Quantizes the replicated state of the engine's objects.
+        """
+        state = NetState(tick)
+        seen: Dict[int, GameObject] = {}
+        for g in self.engine.gameobjects:
+            transform = g.GetComponent(Transform)
+            if not isinstance(transform, Transform):
+                continue
+
+            net_id = self.NetId(g)
+            seen[net_id] = g
+
+            pos = transform.GetPos()
+            speed = direction = 0.0
+            velcontrol = g.GetComponent(VelocityControl)
+            if isinstance(velcontrol, VelocityControl):
+                velocity = velcontrol._state["currentvelocity"]
+                speed, direction = velocity.magnitude, velocity.direction
+
+            values = (pos.x, pos.y, pos.rot.x, speed, direction)
+            state.rows[net_id] = array("i", [round(value * scale) for value, (_, scale) in zip(values, FIELDS)])
+
+        if len(seen) != len(self.objects):
+            # Forget objects that have left the engine
+            self.objects = seen
+            self.ids = {id(g): net_id for net_id, g in seen.items()}
+
+        return state
+
+    def Broadcast(self, tick: int) -> None:
+        """
+        Sends every client the state of a tick, delta compressed against the last state it acknowledged.
+        """
+        if tick % self.rate or not self.clients:
+            return
+
+        state = self.Capture(tick)
+        self.history[tick] = state
+        while len(self.history) > HISTORY:
+            self.history.popitem(last=False)
+
+        for client in list(self.clients.values()):
+            base = self.history.get(client.ack)
+            for packet in EncodeState(state, base):
+                self._Send(packet, client.address)
+
+    def Close(self) -> None:
+        self.socket.close()
+
+    def _Join(self, address: Tuple[str, int]) -> RemoteClient:
+        client = RemoteClient(self._next_client, address)
+        self._next_client += 1
+        self.clients[address] = client
+
+        if self.on_join is not None:
+            entity = self.on_join(client)
+            if entity is not None:
+                if not any(g is entity for g in self.engine.gameobjects):
+                    self.engine.AddObject(entity, len(self.engine.gameobjects))
+                entity.SetInput(client.input)
+                client.entity = entity
+
+        debug(f"Client {client.id} joined from {address[0]}:{address[1]}")
+        return client
+
+    def _Welcome(self, client: RemoteClient) -> None:
+        entity = self.NetId(client.entity) if client.entity is not None else 0
+        self._Send(WELCOME.pack(MSG_WELCOME, client.id, entity, self.engine.tick), client.address)
+
+    def _Input(self, client: RemoteClient, data: bytes) -> None:
+        _, _, tick, ack, count = INPUT.unpack_from(data, 0)
+        offset = INPUT.size
+        keys: List[str] = []
+        for _ in range(count):
+            length = data[offset]
+            keys.append(data[offset + 1:offset + 1 + length].decode())
+            offset += 1 + length
+
+        client.input.Set(tick, keys)
+        if ack != NO_TICK and (client.ack == NO_TICK or ack > client.ack):
+            client.ack = ack
+
+    def _Leave(self, client: RemoteClient) -> None:
+        self.clients.pop(client.address, None)
+
+        if self.on_leave is not None:
+            self.on_leave(client)
+        elif client.entity is not None:
+            self.engine.RemoveObjects([client.entity])
+
+        debug(f"Client {client.id} left")
+
+    def _Send(self, packet: bytes, address: Tuple[str, int]) -> None:
+        try:
+            self.socket.sendto(packet, address)
+            self.sent += len(packet)
+        except (BlockingIOError, InterruptedError):
+            # The send buffer is full; the client will be sent a newer state
+            pass
+
+    def __eq__(self, other) -> bool:
+        return self is other
+
+    def __hash__(self) -> int:
+        return id(self)
+
+    def __str__(self) -> str:
+        return f"NetServer(address={self.address}, clients={len(self.clients)})"
+
+
+class NetClient(BaseObject):
+    """
+    Connects to a `NetServer`, sends local input and mirrors the server's objects.
+
+    Call `Update` once per local tick (e.g. from the engine's `tick`
+    callback). States are rendered `delay` ticks behind the newest one
+    received, interpolating between the two received states either side, so
+    objects move smoothly even when packets arrive unevenly or are lost.
+
+    Args:
+        address: The server's (host, port).
+        engine: An engine to add the mirrored objects to, if any.
+        spawn: Creates the local object for a network id. Defaults to a GameObject with just a Transform.
+        input: The local input to send. Defaults to the shared input backend.
+        delay: The number of ticks to render behind the newest state.
+    """
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        engine: Any = None,
+        spawn: Callable[[int], GameObject] | None = None,
+        input: InputSource | None = None,
+        delay: float = 2
+    ) -> None:
+        self.server = address
+        self.engine = engine
+        self.spawn = spawn
+        self.input = input
+        self.delay = delay
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+
+        self.id: int | None = None
+        self.entity_id: int = 0
+
+        self.states: OrderedDict[int, NetState] = OrderedDict()
+        self.pending: Dict[int, Dict[int, bytes]] = {}
+        self.ack: int = NO_TICK
+        self.time: float | None = None
+        self.tick: int = 0
+
+        self.entities: Dict[int, GameObject] = {}
+        self.received: int = 0
+
+    @property
+    def connected(self) -> bool:
+        return self.id is not None
+
+    def Update(self) -> None:
+        """
+        Receives states, sends input and moves the mirrored objects.
+        """
+        self.tick += 1
+        self.Receive()
+
+        if self.id is None:
+            self.socket.sendto(TYPE.pack(MSG_HELLO), self.server)
+            return
+
+        self.SendInput()
+        self.Interpolate()
+
+    def Receive(self) -> None:
+        while True:
+            try:
+                data, _ = self.socket.recvfrom(65536)
+            except (BlockingIOError, InterruptedError):
+                return
+            except ConnectionResetError:
+                continue
+
+            self.received += len(data)
+            if not data:
+                continue
+            if data[0] == MSG_WELCOME:
+                _, self.id, self.entity_id, _ = WELCOME.unpack_from(data, 0)
+            elif data[0] == MSG_STATE:
+                self._State(data)
+
+    def SendInput(self) -> None:
+        source = self.input if self.input is not None else GetInputBackend()
+        keys = [e.name.encode()[:255] for e in source.get_events()][:255]
+        assert self.id is not None
+        packet = INPUT.pack(MSG_INPUT, self.id, self.tick, self.ack, len(keys)) + b"".join(bytes([len(k)]) + k for k in keys)
+        self.socket.sendto(packet, self.server)
+
+    def Interpolate(self) -> None:
+        """
+        Moves the mirrored objects to their positions `delay` ticks behind the newest state.
+        """
+        if not self.states:
+            return
+
+        newest = next(reversed(self.states))
+        target = newest - self.delay
+        if self.time is None or abs(self.time - target) > 4 * self.delay + 4:
+            self.time = target
+        else:
+            # Advance one tick, nudged towards the target so the delay doesn't drift
+            self.time = min(self.time + 1 + (target - self.time) * 0.1, float(newest))
+
+        before: NetState | None = None
+        after: NetState | None = None
+        for tick, state in self.states.items():
+            if tick <= self.time:
+                before = state
+            else:
+                after = state
+                break
+        if before is None:
+            before = after
+        assert before is not None
+
+        t = 0.0
+        if after is not None and after.tick != before.tick:
+            t = (self.time - before.tick) / (after.tick - before.tick)
+
+        x_scale, y_scale, rot_scale = FIELDS[0][1], FIELDS[1][1], FIELDS[2][1]
+        for net_id, row in before.rows.items():
+            other = after.rows.get(net_id) if after is not None else None
+            x, y, rot = row[0] / x_scale, row[1] / y_scale, row[2] / rot_scale
+            if other is not None and t > 0:
+                x += (other[0] / x_scale - x) * t
+                y += (other[1] / y_scale - y) * t
+                # Turn the short way round
+                rot += ((other[2] / rot_scale - rot + 180) % 360 - 180) * t
+
+            g = self.entities.get(net_id)
+            if g is None:
+                g = self._Spawn(net_id)
+
+            transform = g.GetComponent(Transform)
+            if isinstance(transform, Transform):
+                transform.SetPosition(Position2d(x, y, Rotation2d(rot)))
+
+        gone = [net_id for net_id in self.entities if net_id not in before.rows]
+        if gone:
+            removed = [self.entities.pop(net_id) for net_id in gone]
+            if self.engine is not None:
+                self.engine.RemoveObjects(removed)
+
+    def Close(self) -> None:
+        if self.id is not None:
+            self.socket.sendto(TYPE.pack(MSG_BYE), self.server)
+        self.socket.close()
+
+    def _State(self, data: bytes) -> None:
+        _, tick, base_tick, chunk, chunks, _, _ = STATE.unpack_from(data, 0)
+        if tick in self.states or (self.ack != NO_TICK and tick <= self.ack - HISTORY):
+            return
+
+        parts = self.pending.setdefault(tick, {})
+        parts[chunk] = data
+        if len(parts) < chunks:
+            return
+
+        base = None
+        if base_tick != NO_TICK:
+            base = self.states.get(base_tick)
+            if base is None:
+                # We dropped the base; the server will send against a newer ack or a full state
+                del self.pending[tick]
+                return
+
+        del self.pending[tick]
+        state = DecodeState(base, tick, [parts[i] for i in range(chunks)])
+
+        late = bool(self.states) and tick < next(reversed(self.states))
+        self.states[tick] = state
+        if late:
+            # Arrived out of order; keep the states sorted by tick
+            self.states = OrderedDict(sorted(self.states.items()))
+        while len(self.states) > HISTORY:
+            self.states.popitem(last=False)
+        for old in [t for t in self.pending if t < tick - HISTORY]:
+            del self.pending[old]
+
+        if self.ack == NO_TICK or tick > self.ack:
+            self.ack = tick
+
+    def _Spawn(self, net_id: int) -> GameObject:
+        if self.spawn is not None:
+            g = self.spawn(net_id)
+        else:
+            g = GameObject()
+            g.AddComponent(Transform(Position2d(0, 0, Rotation2d(0))))
+
+        self.entities[net_id] = g
+        if self.engine is not None:
+            self.engine.AddObject(g, len(self.engine.gameobjects))
+        return g
+
+    def __eq__(self, other) -> bool:
+        return self is other
+
+    def __hash__(self) -> int:
+        return id(self)
+
+    def __str__(self) -> str:
+        return f"NetClient(server={self.server}, id={self.id}, ack={self.ack}, entities={len(self.entities)})"
+
+
+# The direction Controls steers in for each key, checked by the loopback test below
+LOOPBACK_KEYS: Dict[str, int] = {"w": 0, "d": 90, "s": 180, "a": 270}
+
+
+def _LoopbackClient(port: int, key: str, ticks: int, results: Any) -> None:
+    """
+    Runs in a client process of the loopback test: holds one key and reports what it mirrored.
+    """
+    from renderer import Engine
+
+    held = RemoteInput()
+    held.Set(0, [key])
+
+    engine = Engine(headless=True, raw_tpr=60)
+    client = NetClient(("127.0.0.1", port), engine, input=held)
+    engine.extra_tick = lambda _: client.Update()
+    engine.Run(ticks=ticks)
+
+    speed = direction = None
+    if client.states:
+        row = client.states[next(reversed(client.states))].rows.get(client.entity_id)
+        if row is not None:
+            speed, direction = row[3] / FIELDS[3][1], row[4] / FIELDS[4][1]
+
+    results.put((key, client.id, len(client.entities), speed, direction))
+    client.Close()
+
+
+if __name__ == "__main__":
+    import argparse
+    import multiprocessing
+    import sys
+
+    from components import Controls
+    from renderer import Engine
+
+    parser = argparse.ArgumentParser(description="Serves a world over loopback to client processes and checks that they stay in sync")
+    parser.add_argument("--clients", type=int, default=2)
+    parser.add_argument("--objects", type=int, default=100)
+    parser.add_argument("--ticks", type=int, default=120)
+    args = parser.parse_args()
+
+    server = Engine(headless=True, raw_tpr=60)
+    for i in range(args.objects):
+        g = GameObject()
+        g.AddComponent(Transform(Position2d(i, 0, Rotation2d(0))))
+        server.AddObject(g)
+
+    def Join(client: RemoteClient) -> GameObject:
+        g = GameObject()
+        g.AddComponent(Transform(Position2d(0, 0, Rotation2d(0))))
+        g.AddComponent(Controls(g))
+        return g
+
+    net = server.Serve(on_join=Join)
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    keys = [list(LOOPBACK_KEYS)[i % len(LOOPBACK_KEYS)] for i in range(args.clients)]
+    processes = [context.Process(target=_LoopbackClient, args=(net.address[1], key, args.ticks, results)) for key in keys]
+    for process in processes:
+        process.start()
+
+    # Keep serving while the clients start up, run and leave
+    server.Run(ticks=args.ticks * 3)
+    for process in processes:
+        process.join()
+
+    failed = 0
+    reports = [results.get() for _ in processes]
+    for key, client_id, mirrored, speed, direction in reports:
+        ok = client_id is not None and mirrored > args.objects and speed and direction == LOOPBACK_KEYS[key]
+        failed += not ok
+        print(f"client {client_id} holding {key}: mirrored {mirrored} objects, moving {speed} towards {direction} {'ok' if ok else 'FAILED'}")
+    print(f"Sent {net.sent} bytes, {len(net.clients)} clients still connected")
+
+    net.Close()
+    if failed or len(reports) != args.clients:
+        sys.exit(1)
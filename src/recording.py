@@ -0,0 +1,205 @@
+import struct
+from typing import BinaryIO, Dict, List, Tuple
+
+import pygame
+from event import InputSource, Keydown
+from logger import debug
+
+MAGIC: bytes = b"PEIR"
+
+# Each record is: run length (ticks), new key names, then the ids of the keys held down.
+RUN = struct.Struct("<I")
+COUNT = struct.Struct("<H")
+NAME_LENGTH = struct.Struct("<B")
+
+
+class InputRecorder(InputSource):
+    """
+    Records the keys held down on every tick of another input source.
+
+    The recorder is itself an input source, so it is installed with
+    `event.SetInputBackend` (or `Engine(input=...)`) in place of the source
+    it wraps. Runs of identical ticks are stored once with a repeat count, so
+    idle stretches cost almost nothing on disk.
+
+    The engine flushes the recording whenever its loop ends (after
+    `Run(ticks=...)`, `Stop` or a finished input). Call `Close`, or use the
+    recorder in a `with` block, to finish the file when recording without
+    the engine.
+
+    Args:
+        source: The input source to record, usually an `event.InputManager`.
+        path: The file to write the recording to.
+    """
+
+    def __init__(self, source: InputSource, path: str) -> None:
+        self.source = source
+        self.path = path
+        self.file: BinaryIO | None = open(path, "wb")
+        self.file.write(MAGIC)
+
+        self.ids: Dict[str, int] = {}
+        self.new_names: List[str] = []
+        self.events: List[Keydown] = []
+
+        self.state: Tuple[int, ...] | None = None
+        self.run = 0
+        self.ticks = 0
+
+    def Advance(self, tick: int) -> None:
+        self.source.Advance(tick)
+        self.events = self.source.get_events()
+
+        ids: List[int] = []
+        for e in self.events:
+            key_id = self.ids.get(e.name)
+            if key_id is None:
+                key_id = len(self.ids)
+                self.ids[e.name] = key_id
+                self.new_names.append(e.name)
+            if key_id not in ids:
+                ids.append(key_id)
+
+        state = tuple(ids)
+        if state == self.state and not self.new_names:
+            self.run += 1
+        else:
+            self._Flush()
+            self.state = state
+            self.run = 1
+
+        self.ticks += 1
+
+    def get_events(self) -> List[Keydown]:
+        return self.events
+
+    def Feed(self, event: pygame.event.Event) -> None:
+        self.source.Feed(event)
+
+    def Flush(self) -> None:
+        """
+        Writes the ticks recorded so far to disk. Recording can carry on afterwards.
+        """
+        if self.file is None:
+            return
+
+        self._Flush()
+        self.file.flush()
+
+    def Close(self) -> None:
+        if self.file is None:
+            return
+
+        self._Flush()
+        self.file.close()
+        self.file = None
+        self.source.Close()
+
+        debug(f"Recorded {self.ticks} ticks of input to {self.path}")
+
+    def __enter__(self) -> "InputRecorder":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.Close()
+
+    def _Flush(self) -> None:
+        if self.state is None or self.run == 0 or self.file is None:
+            return
+
+        parts = [RUN.pack(self.run), COUNT.pack(len(self.new_names))]
+        for name in self.new_names:
+            encoded = name.encode()
+            parts.append(NAME_LENGTH.pack(len(encoded)))
+            parts.append(encoded)
+        parts.append(COUNT.pack(len(self.state)))
+        parts.extend(COUNT.pack(key_id) for key_id in self.state)
+
+        self.file.write(b"".join(parts))
+        self.new_names = []
+        self.run = 0
+
+
+class InputReplay(InputSource):
+    """
+    Feeds a recording made by `InputRecorder` back into the engine.
+
+    Exactly one recorded tick is consumed per engine tick regardless of wall
+    time, so a replay gives the same simulation every run. Run the engine
+    uncapped (`raw_tpr=0`) to use a replay as a benchmark load.
+
+    Args:
+        path: The recording to play.
+        loop: Whether to start again from the beginning once the recording ends.
+    """
+
+    def __init__(self, path: str, loop: bool = False) -> None:
+        self.path = path
+        self.loop = loop
+
+        # (run length, events) for each record
+        self.records: List[Tuple[int, List[Keydown]]] = []
+        self._Load(path)
+
+        self.record = 0
+        self.remaining = self.records[0][0] if self.records else 0
+        self.events: List[Keydown] = []
+        self.finished = not self.records
+
+    @property
+    def ticks(self) -> int:
+        """
+        The number of ticks in the recording.
+        """
+        return sum(run for run, _ in self.records)
+
+    def Advance(self, tick: int) -> None:
+        if self.finished:
+            self.events = []
+            return
+
+        if self.remaining == 0:
+            self.record = (self.record + 1) % len(self.records)
+            self.remaining = self.records[self.record][0]
+
+        self.events = self.records[self.record][1]
+        self.remaining -= 1
+
+        # Finish on the last recorded tick so the engine stops without running an extra one
+        if not self.loop and self.remaining == 0 and self.record == len(self.records) - 1:
+            self.finished = True
+
+    def get_events(self) -> List[Keydown]:
+        return self.events.copy()
+
+    def _Load(self, path: str) -> None:
+        with open(path, "rb") as f:
+            data = f.read()
+
+        if data[:len(MAGIC)] != MAGIC:
+            raise Exception(f"{path} is not an input recording")
+
+        names: List[str] = []
+        keys: List[Keydown] = []
+        offset = len(MAGIC)
+        while offset < len(data):
+            (run,) = RUN.unpack_from(data, offset)
+            offset += RUN.size
+
+            (new,) = COUNT.unpack_from(data, offset)
+            offset += COUNT.size
+            for _ in range(new):
+                (length,) = NAME_LENGTH.unpack_from(data, offset)
+                offset += NAME_LENGTH.size
+                names.append(data[offset:offset + length].decode())
+                keys.append(Keydown(1, names[-1]))
+                offset += length
+
+            (count,) = COUNT.unpack_from(data, offset)
+            offset += COUNT.size
+            held = [keys[COUNT.unpack_from(data, offset + i * COUNT.size)[0]] for i in range(count)]
+            offset += count * COUNT.size
+
+            self.records.append((run, held))
+
+        debug(f"Loaded {len(self.records)} input records from {path}")
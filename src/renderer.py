@@ -1,18 +1,33 @@
+import asyncio
 from dataclasses import dataclass
 import threading
 from types import FunctionType
 from typing import Any, Callable, List, Tuple
+from assets import AssetManager
 from base import BaseComponent
 from camera import Camera2d, ViewportSize2d
-from components import MatchComponent, Model
+from capture import FrameCapture
+from components import MatchComponent, Model, Transform
+from event import InputSource, SetInputBackend
 from gameobject import GameObject
+from hierarchy import default_hierarchy
 from logger import debug
+from memory import MemoryReport, Report
+from net import NetServer, RemoteClient
+from scene import Scene, SceneStreamer
+from scheduler import FrameScheduler
+from snapshot import Capture, Restore, Snapshot
+from tasks import TaskRunner, default_tasks
 from surface import Screen
+from timers import TimerHandle, TimerWheel
 from utils import BaseObject, Color, Position2d, Resolution, Rotation2d
 import pygame
 
 consts: dict[str, bool] = {"INIT": False}
 
+# Ticks per second per `tpr` when there is no display to take the refresh rate from
+HEADLESS_RATE: int = 60
+
 def __init__():
     if not consts["INIT"]:
         debug("Initializing")
@@ -23,21 +38,76 @@ class Renderer(BaseObject):
     def __init__(self, res: Resolution = Resolution(800, 600), color: Color = Color(0, 0, 0)) -> None:
         self.screen: Screen = Screen(res)
         self.color: Color = color
+        self.views: dict[Tuple[int, int, int, int], Screen] = {}
+        self.capture: FrameCapture | None = None
 
         debug("Color is " + self.color.string())
-    
-    def Render(self, gameobjects: List[GameObject], camera: Camera2d):
+
+    def Render(self, gameobjects: List[GameObject], camera: Camera2d | List[Camera2d]):
+        """
+        Draws every visible model once per camera.
+
+        Models are gathered once per frame and culled once per camera. Every
+        camera draws into its own viewport and shares the sprite caches.
+        """
+        cameras: List[Camera2d] = camera if isinstance(camera, list) else [camera]
+
         self.screen.fill(self.color)
 
+        models: List[Model] = []
         for g in gameobjects:
             comp: BaseComponent | None = g.GetComponent(Model)
             if comp is not None:
                 if isinstance(comp, Model):
-                    model: Model = comp
-                    model.Render(self.screen, camera)
+                    models.append(comp)
+
+        for cam in cameras:
+            screen = self.View(cam)
+            screen.zoom = cam.zoom
+
+            for model in self.Cull(models, cam):
+                model._Render(screen, cam.GlobalToLocal(model.transform.GetPos()))
 
         pygame.display.update()
 
+        if self.capture is not None:
+            self.capture.Frame(self.screen._screen)
+
+    def Record(self, capture: FrameCapture) -> FrameCapture:
+        """
+        Starts recording presented frames, stopping any previous recording.
+        """
+        self.StopRecording()
+        self.capture = capture
+        return capture
+
+    def StopRecording(self):
+        """
+        Stops recording, waiting for the frames already captured to be written.
+        """
+        if self.capture is not None:
+            self.capture.Close()
+            self.capture = None
+
+    def View(self, camera: Camera2d) -> Screen:
+        """
+        Returns the screen a camera draws into, clearing it if it only covers part of the window.
+        """
+        if camera.viewport is None:
+            return self.screen
+
+        key = (camera.viewport.x, camera.viewport.y, camera.viewport.width, camera.viewport.height)
+        view = self.views.get(key)
+        if view is None:
+            view = self.screen.View(camera.viewport)
+            self.views[key] = view
+
+        view.fill(self.color)
+        return view
+
+    def Cull(self, models: List[Model], camera: Camera2d) -> List[Model]:
+        return [model for model in models if model.Visible(camera)]
+
 class Engine(BaseObject):
     def __init__(
         self,
@@ -46,63 +116,336 @@ class Engine(BaseObject):
         camera: Camera2d | None = None,
         tpr: int | None = None,
         raw_tpr: float | int | None = None,
-        tick: Callable[[Any], None] | None = None
+        tick: Callable[[Any], None] | None = None,
+        input: InputSource | None = None,
+        budget: float | None = None,
+        headless: bool = False
     ) -> None:
+        """
+        Args:
+            input: The input source for every component, such as an `InputRecorder` or `InputReplay`. Defaults to the live
+                keyboard, or to a source that never reports keys when headless.
+            budget: A time budget in milliseconds for each tick's component updates. When set, ticks are run by a
+                `FrameScheduler` that respects component priorities and frequencies and defers work that doesn't fit.
+            headless: Whether to run without a window, e.g. as a dedicated server. Nothing is rendered and no
+                native events are read; `tpr` is relative to `HEADLESS_RATE` instead of the display's refresh rate.
+        """
         __init__()
         
         if color is None:
             color = Color(255, 255, 255)
-        if renderer is None:
+        if renderer is None and not headless:
             renderer = Renderer(color=color)
         if camera is None:
             camera = Camera2d(ViewportSize2d(800, 600))
         if tpr is None:
             tpr = 1
 
-        self.renderer: Renderer = renderer
+        self.renderer: Renderer | None = renderer
+        self.headless: bool = headless
         self.gameobjects: List[GameObject] = []
         self.color: Color = color
         self.camera: Camera2d = camera
+        self.cameras: List[Camera2d] = [camera]
 
         self.clock: pygame.time.Clock = pygame.time.Clock()
-        self.tpr: int = tpr * pygame.display.get_current_refresh_rate()
+        self.tpr: int = tpr * (HEADLESS_RATE if headless else pygame.display.get_current_refresh_rate())
         self.tick: int = 0
 
         self.extra_tick: Callable[[Any], None] | None = tick
 
         self.raw_tpr: int | float | None = raw_tpr
+
+        if input is None and headless:
+            # A dedicated server has no keyboard; its players' input arrives per client over the network
+            input = InputSource()
+
+        self.input: InputSource | None = input
+        if input is not None:
+            SetInputBackend(input)
+
+        self.timers: TimerWheel = TimerWheel()
+        self.assets: AssetManager = AssetManager()
+        self.streamers: List[SceneStreamer] = []
+
+        self.scheduler: FrameScheduler | None = None
+        if budget is not None:
+            self.scheduler = FrameScheduler(budget, self)
+
+        self.server: NetServer | None = None
+        self.tasks: TaskRunner = default_tasks
+
+        self.running: bool = False
             
-    def Run(self, block=True):
+    def Run(self, block=True, ticks: int | None = None):
+        """
+        Runs the engine loop.
+
+        Args:
+            block: Whether to run on the calling thread.
+            ticks: The number of ticks to run for. Defaults to running until stopped.
+        """
         if block:
-            self._run()
+            self._run(ticks)
         else:
-            threading.Thread(target=lambda: self._run(), daemon=True).start()
+            threading.Thread(target=lambda: self._run(ticks), daemon=True).start()
 
-    def _run(self):
-        while True:
-            for g in self.gameobjects:
-                g.OnTick()
+    def _run(self, ticks: int | None = None):
+        self.running = True
+        end = None if ticks is None else self.tick + ticks
 
-            self.renderer.Render(self.gameobjects, self.camera)
+        while self.running and (end is None or self.tick < end):
+            self.Step()
 
-            self.CheckNative()
-
-            if self.extra_tick is not None:
-                self.extra_tick(self)
-            
-            self.tick+=1
+            if self.input is not None and self.input.finished:
+                debug(f"Input finished after {self.tick} ticks")
+                self.running = False
 
             if self.raw_tpr is not None:
                 self.clock.tick(self.raw_tpr)
             else:
                 self.clock.tick(self.tpr)
 
+        self.running = False
+
+        if self.input is not None:
+            self.input.Flush()
+
+    async def RunAsync(self, ticks: int | None = None):
+        """
+        Runs the engine loop as a coroutine on the running asyncio event loop.
+
+        Ticks are paced against `loop.time()` and the loop sleeps between
+        them, so other coroutines (including ones started by components with
+        `Await`) run while the engine waits for the next tick. If ticks take
+        longer than the tick interval, the engine runs behind rather than
+        trying to catch up.
+
+        Args:
+            ticks: The number of ticks to run for. Defaults to running until stopped.
+        """
+        loop = asyncio.get_running_loop()
+        interval = 1 / self.TickRate
+
+        self.running = True
+        end = None if ticks is None else self.tick + ticks
+        deadline = loop.time()
+
+        while self.running and (end is None or self.tick < end):
+            self.Step()
+
+            if self.input is not None and self.input.finished:
+                debug(f"Input finished after {self.tick} ticks")
+                self.running = False
+
+            deadline += interval
+            now = loop.time()
+            if deadline < now - interval:
+                # Too far behind to catch up; pace from now instead
+                deadline = now
+            await asyncio.sleep(max(0, deadline - now))
+
+        self.running = False
+
+        if self.input is not None:
+            self.input.Flush()
+
+    def Step(self):
+        """
+        Runs a single tick: input, object ticks, rendering and native events.
+        """
+        if self.input is not None:
+            self.input.Advance(self.tick)
+
+        if self.server is not None:
+            self.server.Receive()
+
+        self.tasks.Deliver()
+
+        self.timers.Advance()
+        self.assets.Poll()
+
+        for streamer in self.streamers:
+            streamer.Update()
+
+        if self.scheduler is not None:
+            self.scheduler.Run(self.gameobjects, self.tick)
+        else:
+            for g in self.gameobjects:
+                if g.Active:
+                    g.OnTick()
+
+        default_hierarchy.Update()
+
+        if self.server is not None:
+            self.server.Broadcast(self.tick)
+
+        if self.renderer is not None:
+            self.renderer.Render(self.gameobjects, self.cameras)
+
+        if not self.headless:
+            self.CheckNative()
+
+        if self.extra_tick is not None:
+            self.extra_tick(self)
+        
+        self.tick+=1
+
+    def Stop(self):
+        """
+        Stops the engine loop after the current tick.
+        """
+        self.running = False
+
     def AddObject(self, obj: GameObject, layer: int = 0):
         self.gameobjects.insert(layer, obj)
 
+    def RemoveObject(self, obj: GameObject):
+        """
+        Removes an object from the engine, takes its transform out of its hierarchy and cancels the timers and
+        tasks owned by it or its components.
+        """
+        self.gameobjects.remove(obj)
+        self._Detach([obj])
+
+        self.timers.CancelOwner(obj)
+        self.tasks.CancelOwner(obj)
+        for comp in obj.components:
+            self.timers.CancelOwner(comp)
+            self.tasks.CancelOwner(comp)
+
+    def RemoveObjects(self, objs: List[GameObject]):
+        """
+        Removes many objects at once, rebuilding the object list a single time.
+        """
+        removing = {id(obj) for obj in objs}
+        self.gameobjects = [g for g in self.gameobjects if id(g) not in removing]
+        self._Detach(objs)
+
+        for obj in objs:
+            self.timers.CancelOwner(obj)
+            self.tasks.CancelOwner(obj)
+            for comp in obj.components:
+                self.timers.CancelOwner(comp)
+                self.tasks.CancelOwner(comp)
+
+    def _Detach(self, objs: List[GameObject]):
+        # Removed transforms must leave their hierarchy, or it keeps them (and updates them) forever
+        hierarchies: dict[int, Tuple[Any, List[Transform]]] = {}
+        for obj in objs:
+            transform = obj.GetComponent(Transform)
+            if isinstance(transform, Transform) and transform._hierarchy is not None:
+                hierarchies.setdefault(id(transform._hierarchy), (transform._hierarchy, []))[1].append(transform)
+
+        for hierarchy, nodes in hierarchies.values():
+            hierarchy.RemoveMany(nodes)
+
+    def Stream(self, scene: Scene, radius: int = 1) -> SceneStreamer:
+        """
+        Loads and unloads regions of a scene around the main camera as it moves.
+
+        Args:
+            scene: The scene to stream.
+            radius: The number of regions around the camera's region to keep loaded.
+        """
+        streamer = SceneStreamer(self, scene, radius)
+        self.streamers.append(streamer)
+        streamer.Update()
+        return streamer
+
+    def Serve(
+        self,
+        port: int = 0,
+        host: str = "127.0.0.1",
+        on_join: Callable[[RemoteClient], GameObject | None] | None = None,
+        on_leave: Callable[[RemoteClient], None] | None = None,
+        rate: int = 1
+    ) -> NetServer:
+        """
+        Makes the engine the authoritative server for remote clients over UDP.
+
+        Args:
+            port: The UDP port to listen on. 0 picks a free port; see `NetServer.address`.
+            host: The interface to listen on.
+            on_join: Called with each new client. May return the object the client controls, which then reads the client's input.
+            on_leave: Called when a client leaves or times out. Defaults to removing the client's object.
+            rate: Send state every N ticks.
+        """
+        if self.server is not None:
+            raise Exception("The engine is already serving")
+
+        self.server = NetServer(self, port, host, on_join, on_leave, rate)
+        return self.server
+
+    def MemoryReport(self) -> MemoryReport:
+        """
+        Reports the memory held per component type, per sprite cache and per subsystem, and the live threads.
+        """
+        return Report(self)
+
+    @property
+    def TickRate(self) -> float:
+        """
+        The number of ticks per simulated second.
+        """
+        if self.raw_tpr:
+            return self.raw_tpr
+        return self.tpr
+
+    def Schedule(self, seconds: float, callback: Callable[[], None], repeat: bool = False, owner: Any = None) -> TimerHandle:
+        """
+        Runs a callback after a number of simulated seconds, measured in ticks rather than wall time.
+
+        Args:
+            seconds: The delay in simulated seconds.
+            callback: The function to call.
+            repeat: Whether to keep running the callback every `seconds` until cancelled.
+            owner: A GameObject or component; its timers are cancelled when it is removed with `RemoveObject`.
+        """
+        return self.timers.Schedule(round(seconds * self.TickRate), callback, repeat, owner)
+
+    def AddCamera(self, camera: Camera2d):
+        """
+        Adds a camera drawn after the existing ones, such as a split-screen view or minimap.
+        """
+        self.cameras.append(camera)
+
+    def RemoveCamera(self, camera: Camera2d):
+        if camera is self.camera:
+            raise Exception("Cannot remove the main camera")
+        self.cameras.remove(camera)
+
+    def Snapshot(self, base: Snapshot | None = None) -> Snapshot:
+        """
+        Captures the state of every object and camera.
+
+        Args:
+            base: A previous snapshot whose sprite table should be reused, so the two can be diffed.
+        """
+        return Capture(self.gameobjects, self.cameras, self.tick, base.sprites if base is not None else None)
+
+    def Restore(self, snapshot: Snapshot):
+        """
+        Rolls every object and camera back to a snapshot taken from this world.
+        """
+        Restore(snapshot, self.gameobjects, self.cameras)
+        self.tick = snapshot.tick
+
     def exit(self):
         debug("Cleaning Up")
 
+        if self.input is not None:
+            self.input.Close()
+
+        self.assets.Close()
+        self.tasks.CancelAll()
+
+        if self.renderer is not None:
+            self.renderer.StopRecording()
+
+        if self.server is not None:
+            self.server.Close()
+
     def CheckNative(self):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -110,6 +453,8 @@ class Engine(BaseObject):
                 pygame.quit()
                 self.exit()
                 exit()
+            elif self.input is not None and (event.type == pygame.KEYDOWN or event.type == pygame.KEYUP):
+                self.input.Feed(event)
 
     @property
     def Camera(self) -> Camera2d:
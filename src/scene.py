@@ -0,0 +1,322 @@
+from array import array
+import math
+import mmap
+import struct
+from typing import Any, Dict, List, Set, Tuple
+
+from assets import AssetManager
+from components import Controls, Model, Transform, VelocityControl
+from gameobject import GameObject
+from logger import debug, warning
+from snapshot import HAS_CONTROLS, HAS_MODEL, HAS_TRANSFORM, HAS_VELOCITY
+from sprite import ImageSprite, Sprite, Square
+from utils import BaseObject, Color, Position2d, Rotation2d, SquareSize
+
+MAGIC: bytes = b"PESC"
+VERSION: int = 1
+
+SPRITE_NONE: int = 0
+SPRITE_SQUARE: int = 1
+SPRITE_IMAGE: int = 2
+
+# magic, version, region size, entities, regions, strings
+HEADER = struct.Struct("<4sHdIII")
+# region x, region y, first entity, entity count
+REGION = struct.Struct("<iiII")
+
+# Component columns, one value per entity, stored in region order
+COLUMNS: List[Tuple[str, str]] = [
+    ("x", "d"),
+    ("y", "d"),
+    ("rot", "d"),
+    ("velocity", "d"),
+    ("speed", "d"),
+    ("size", "d"),
+    ("sprite_ref", "I"),
+    ("mask", "B"),
+    ("sprite_kind", "B"),
+]
+
+ALIGN: int = 8
+
+
+def _Pad(length: int) -> int:
+    return (ALIGN - length % ALIGN) % ALIGN
+
+
+def RegionOf(x: float, y: float, region_size: float) -> Tuple[int, int]:
+    return (math.floor(x / region_size), math.floor(y / region_size))
+
+
+def SaveScene(path: str, gameobjects: List[GameObject], region_size: float = 1024) -> int:
+    """
+    Writes objects to a scene file.
+
+    Objects are grouped into square regions of `region_size` world units by
+    their world position, so a region can later be loaded on its own.
+    `Transform`, `VelocityControl`, `Controls` and `Model` are saved; models
+    are saved as square or image sprites. Objects without a Transform can't
+    be placed in a region and are skipped.
+
+    Returns:
+        The number of objects written.
+    """
+    strings: List[str] = []
+    string_ids: Dict[str, int] = {}
+    rows: List[Tuple[Tuple[int, int], Tuple[Any, ...]]] = []
+    skipped = 0
+
+    for g in gameobjects:
+        transform = g.GetComponent(Transform)
+        if not isinstance(transform, Transform):
+            skipped += 1
+            continue
+
+        pos = transform.GetPos()
+        mask = HAS_TRANSFORM
+        velocity = speed = size = 0.0
+        kind = SPRITE_NONE
+        ref = 0
+
+        velcontrol = g.GetComponent(VelocityControl)
+        if isinstance(velcontrol, VelocityControl):
+            mask |= HAS_VELOCITY
+            velocity = velcontrol._state["velocity"]
+
+        controls = g.GetComponent(Controls)
+        if isinstance(controls, Controls):
+            mask |= HAS_CONTROLS
+            speed = controls._state["speed"]
+
+        model = g.GetComponent(Model)
+        if isinstance(model, Model):
+            mask |= HAS_MODEL
+            sprite = model.sprite
+            if isinstance(sprite, Square):
+                kind = SPRITE_SQUARE
+                r, b, gr = sprite.color.rgb()
+                ref = (r << 16) | (b << 8) | gr
+                size = sprite.size.length
+            elif isinstance(sprite, ImageSprite):
+                kind = SPRITE_IMAGE
+                if sprite.path not in string_ids:
+                    string_ids[sprite.path] = len(strings)
+                    strings.append(sprite.path)
+                ref = string_ids[sprite.path]
+                size = sprite.scale
+
+        rows.append((RegionOf(pos.x, pos.y, region_size), (pos.x, pos.y, pos.rot.x, velocity, speed, size, ref, mask, kind)))
+
+    if skipped:
+        warning(f"Skipped {skipped} objects without a Transform while saving {path}")
+
+    rows.sort(key=lambda row: row[0])
+
+    regions: List[Tuple[int, int, int, int]] = []
+    for i, (key, _) in enumerate(rows):
+        if regions and (regions[-1][0], regions[-1][1]) == key:
+            rx, ry, first, count = regions[-1]
+            regions[-1] = (rx, ry, first, count + 1)
+        else:
+            regions.append((key[0], key[1], i, 1))
+
+    encoded = [s.encode() for s in strings]
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, region_size, len(rows), len(regions), len(encoded)))
+        for s in encoded:
+            f.write(struct.pack("<H", len(s)))
+            f.write(s)
+        for region in regions:
+            f.write(REGION.pack(*region))
+        f.write(b"\0" * _Pad(f.tell()))
+
+        for c, (_, typecode) in enumerate(COLUMNS):
+            data = array(typecode, [row[1][c] for row in rows]).tobytes()
+            f.write(data)
+            f.write(b"\0" * _Pad(len(data)))
+
+    debug(f"Saved {len(rows)} objects in {len(regions)} regions to {path}")
+    return len(rows)
+
+
+class Scene(BaseObject):
+    """
+    A scene file opened with a memory map.
+
+    Only the header and region index are read up front. Component columns are
+    views into the map, so loading a region reads just that region's slice of
+    each column and the operating system pages the rest in and out as needed.
+
+    Args:
+        path: The scene file.
+        assets: Loads image sprites in the background if given; otherwise images are loaded synchronously.
+    """
+
+    def __init__(self, path: str, assets: AssetManager | None = None) -> None:
+        self.path = path
+        self.assets = assets
+
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self.map)
+        view = self._view
+
+        magic, version, self.region_size, self.entities, region_count, string_count = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise Exception(f"{path} is not a scene file")
+        if version != VERSION:
+            raise Exception(f"{path} has scene version {version}, expected {VERSION}")
+
+        offset = HEADER.size
+        self.strings: List[str] = []
+        for _ in range(string_count):
+            (length,) = struct.unpack_from("<H", self.map, offset)
+            offset += 2
+            self.strings.append(bytes(view[offset:offset + length]).decode())
+            offset += length
+
+        self.regions: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        for _ in range(region_count):
+            rx, ry, first, count = REGION.unpack_from(self.map, offset)
+            self.regions[(rx, ry)] = (first, count)
+            offset += REGION.size
+        offset += _Pad(offset)
+
+        self.columns: Dict[str, memoryview] = {}
+        for name, typecode in COLUMNS:
+            length = self.entities * struct.calcsize(typecode)
+            self.columns[name] = view[offset:offset + length].cast(typecode)
+            offset += length + _Pad(length)
+
+        self._sprites: Dict[Tuple[int, int, float], Sprite] = {}
+
+    def RegionAt(self, pos: Position2d) -> Tuple[int, int]:
+        return RegionOf(pos.x, pos.y, self.region_size)
+
+    def LoadRegion(self, key: Tuple[int, int]) -> List[GameObject]:
+        """
+        Creates the objects stored in a region. Returns an empty list for regions with no objects.
+        """
+        region = self.regions.get(key)
+        if region is None:
+            return []
+
+        first, count = region
+        c = self.columns
+        objects: List[GameObject] = []
+        for i in range(first, first + count):
+            mask = c["mask"][i]
+
+            g = GameObject()
+            g.AddComponent(Transform(Position2d(c["x"][i], c["y"][i], Rotation2d(c["rot"][i]))))
+
+            if mask & HAS_VELOCITY:
+                g.AddComponent(VelocityControl(g, c["velocity"][i]))
+            if mask & HAS_CONTROLS:
+                controls = Controls(g)
+                controls._state["speed"] = c["speed"][i]
+                g.AddComponent(controls)
+            if mask & HAS_MODEL:
+                g.AddComponent(Model(g, self._Sprite(c["sprite_kind"][i], c["sprite_ref"][i], c["size"][i])))
+
+            objects.append(g)
+
+        return objects
+
+    def _Sprite(self, kind: int, ref: int, size: float) -> Sprite:
+        # Objects with the same sprite share one instance
+        key = (kind, ref, size)
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            return sprite
+
+        if kind == SPRITE_SQUARE:
+            sprite = Square(SquareSize(size), Color((ref >> 16) & 0xFF, (ref >> 8) & 0xFF, ref & 0xFF))
+        elif kind == SPRITE_IMAGE:
+            path = self.strings[ref]
+            if self.assets is not None:
+                sprite = self.assets.Load(path, scale=size)
+            else:
+                sprite = ImageSprite(path)
+                sprite.scale = size
+        else:
+            sprite = Sprite()
+
+        self._sprites[key] = sprite
+        return sprite
+
+    def Close(self) -> None:
+        for column in self.columns.values():
+            column.release()
+        self.columns = {}
+        self._view.release()
+        self.map.close()
+        self.file.close()
+
+    def __str__(self) -> str:
+        return f"Scene(path={self.path}, entities={self.entities}, regions={len(self.regions)})"
+
+
+class SceneStreamer(BaseObject):
+    """
+    Keeps the regions of a scene around the camera loaded in an engine.
+
+    Regions within `radius` regions of the camera are loaded; regions more
+    than `radius + 1` away are unloaded, so moving back and forth over a
+    region border doesn't reload it every tick. Resident memory is bounded by
+    the objects in at most `(2 * radius + 3) ** 2` regions.
+
+    Args:
+        engine: The engine to add objects to and take the camera from.
+        scene: The scene to stream.
+        radius: The number of regions around the camera's region to keep loaded.
+    """
+
+    def __init__(self, engine: Any, scene: Scene, radius: int = 1) -> None:
+        self.engine = engine
+        self.scene = scene
+        self.radius = radius
+
+        self.loaded: Dict[Tuple[int, int], List[GameObject]] = {}
+        self.center: Tuple[int, int] | None = None
+
+    def Update(self) -> None:
+        center = self.scene.RegionAt(self.engine.camera.pos)
+        if center == self.center:
+            return
+        self.center = center
+
+        cx, cy = center
+        keep = self.radius + 1
+        for key in [k for k in self.loaded if abs(k[0] - cx) > keep or abs(k[1] - cy) > keep]:
+            self.engine.RemoveObjects(self.loaded.pop(key))
+
+        wanted: Set[Tuple[int, int]] = {
+            (x, y)
+            for x in range(cx - self.radius, cx + self.radius + 1)
+            for y in range(cy - self.radius, cy + self.radius + 1)
+        }
+        for key in wanted:
+            if key in self.loaded or key not in self.scene.regions:
+                continue
+            objects = self.scene.LoadRegion(key)
+            for g in objects:
+                self.engine.AddObject(g, len(self.engine.gameobjects))
+            self.loaded[key] = objects
+
+    def UnloadAll(self) -> None:
+        for objects in self.loaded.values():
+            self.engine.RemoveObjects(objects)
+        self.loaded = {}
+        self.center = None
+
+    @property
+    def resident(self) -> int:
+        """
+        The number of objects currently loaded from the scene.
+        """
+        return sum(len(objects) for objects in self.loaded.values())
+
+    def __str__(self) -> str:
+        return f"SceneStreamer(scene={self.scene}, regions={len(self.loaded)}, resident={self.resident})"
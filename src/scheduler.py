@@ -0,0 +1,191 @@
+from dataclasses import dataclass
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from base import BEST_EFFORT, EVERY_FRAME, PRIORITY_CRITICAL, PRIORITY_LOW, PRIORITY_NORMAL, BaseComponent
+from gameobject import GameObject
+from utils import BaseObject
+
+
+class System(BaseObject):
+    """
+    A function run by the scheduler alongside component ticks.
+
+    Args:
+        fn: Called with the scheduler's `context` (the engine) when the system runs.
+        priority: The priority of the system.
+        frequency: Run every N frames, or `BEST_EFFORT` for spare time only.
+    """
+
+    def __init__(self, fn: Callable[[Any], None], priority: int = PRIORITY_NORMAL, frequency: int = EVERY_FRAME) -> None:
+        self.fn = fn
+        self.priority = priority
+        self.frequency = frequency
+        self._phase: int | None = None
+
+    def OnTick(self, context: Any) -> None:
+        self.fn(context)
+
+
+@dataclass
+class SchedulerStats:
+    """
+    Counters describing how the scheduler spent its frames.
+
+    Attributes:
+        frames: The number of frames run.
+        ran: The number of ticks run, including critical and best effort ticks.
+        deferred: The number of due ticks pushed to a later frame because the budget ran out.
+        best_effort: The number of best effort ticks run in spare time.
+        overruns: The number of frames where critical work alone exceeded the budget.
+        last_frame_ms: The time the last frame's ticks took.
+        last_deferred: The number of ticks deferred by the last frame.
+    """
+
+    frames: int = 0
+    ran: int = 0
+    deferred: int = 0
+    best_effort: int = 0
+    overruns: int = 0
+    last_frame_ms: float = 0
+    last_deferred: int = 0
+
+
+# (object with OnTick, argument to pass it)
+Entry = Tuple[Any, Any]
+
+
+class FrameScheduler(BaseObject):
+    """
+    Runs component ticks and systems within a per-frame time budget.
+
+    Critical work runs every frame. Other work runs on the frames its
+    frequency makes it due, in priority order, until the budget is used up;
+    anything left over is deferred and runs ahead of new work of the same
+    priority on the next frame. Best effort work runs round-robin in
+    whatever time is left after that.
+
+    Work with a frequency of N is spread over the N frames by giving each
+    component a fixed phase, so not everything lands on the same frame.
+
+    Attributes:
+        budget: The time budget for a frame's ticks in milliseconds.
+        context: The argument passed to systems, usually the engine.
+        stats: The scheduler's counters.
+    """
+
+    def __init__(self, budget: float, context: Any = None) -> None:
+        self.budget = budget
+        self.context = context
+        self.systems: List[System] = []
+        self.stats = SchedulerStats()
+
+        self.deferred: List[Entry] = []
+        self._best_effort_cursor = 0
+        self._phases = 0
+
+    def AddSystem(self, fn: Callable[[Any], None], priority: int = PRIORITY_NORMAL, frequency: int = EVERY_FRAME) -> System:
+        system = System(fn, priority, frequency)
+        self.systems.append(system)
+        return system
+
+    def RemoveSystem(self, system: System) -> None:
+        self.systems.remove(system)
+
+    def Run(self, gameobjects: List[GameObject], tick: int) -> None:
+        """
+        Runs one frame of ticks.
+
+        Args:
+            gameobjects: The objects to tick.
+            tick: The engine tick, used to decide which work is due.
+        """
+        start = time.perf_counter()
+        deadline = start + self.budget / 1000
+
+        critical: List[Entry] = []
+        best_effort: List[Entry] = []
+        due: List[List[Entry]] = [[] for _ in range(PRIORITY_LOW + 1)]
+
+        # Everything still scheduled this frame, so deferred work that has since been
+        # removed or put to sleep is dropped instead of run
+        live = set()
+
+        for system in self.systems:
+            live.add(id(system))
+            self._Classify(system, self.context, tick, critical, best_effort, due)
+
+        for g in gameobjects:
+            if not g.Active:
+                continue
+            g.UpdateSleepers()
+            for component in g.ticking:
+                live.add(id(component))
+                self._Classify(component, g, tick, critical, best_effort, due)
+
+        ran = 0
+        for target, arg in critical:
+            target.OnTick(arg)
+        ran += len(critical)
+
+        if time.perf_counter() >= deadline:
+            self.stats.overruns += 1
+
+        # Work deferred from the last frame goes ahead of new work of the same priority,
+        # without running it twice if it is due again
+        self.deferred = [entry for entry in self.deferred if id(entry[0]) in live and not getattr(entry[0], "sleeping", False)]
+        queued = {id(target) for target, _ in self.deferred}
+        work: List[Entry] = []
+        for priority, bucket in enumerate(due):
+            work.extend(entry for entry in self.deferred if min(entry[0].priority, PRIORITY_LOW) == priority)
+            work.extend(entry for entry in bucket if id(entry[0]) not in queued)
+
+        self.deferred = []
+        for i, (target, arg) in enumerate(work):
+            if time.perf_counter() >= deadline:
+                self.deferred = work[i:]
+                break
+            target.OnTick(arg)
+            ran += 1
+
+        best_effort_ran = 0
+        if best_effort and not self.deferred:
+            cursor = self._best_effort_cursor % len(best_effort)
+            while best_effort_ran < len(best_effort) and time.perf_counter() < deadline:
+                target, arg = best_effort[cursor]
+                target.OnTick(arg)
+                best_effort_ran += 1
+                cursor = (cursor + 1) % len(best_effort)
+            self._best_effort_cursor = cursor
+
+        self.stats.frames += 1
+        self.stats.ran += ran + best_effort_ran
+        self.stats.best_effort += best_effort_ran
+        self.stats.deferred += len(self.deferred)
+        self.stats.last_deferred = len(self.deferred)
+        self.stats.last_frame_ms = (time.perf_counter() - start) * 1000
+
+    def _Classify(self, target: BaseComponent | System, arg: Any, tick: int, critical: List[Entry], best_effort: List[Entry], due: List[List[Entry]]) -> None:
+        if target.priority <= PRIORITY_CRITICAL:
+            critical.append((target, arg))
+            return
+
+        frequency = target.frequency
+        if frequency == BEST_EFFORT:
+            best_effort.append((target, arg))
+            return
+
+        if frequency > 1:
+            if target._phase is None:
+                target._phase = self._phases
+                self._phases += 1
+            if (tick + target._phase) % frequency != 0:
+                return
+
+        due[min(target.priority, PRIORITY_LOW)].append((target, arg))
+
+    def Stats(self) -> Dict[str, float]:
+        return self.stats.__dict__.copy()
+
+    def __str__(self) -> str:
+        return f"FrameScheduler(budget={self.budget}, systems={len(self.systems)}, stats={self.stats})"
@@ -0,0 +1,344 @@
+from array import array
+import struct
+from typing import Dict, List, Tuple
+
+from camera import Camera2d
+from components import Controls, Model, Transform, Velocity, VelocityControl
+from gameobject import GameObject
+from sprite import Sprite
+from utils import BaseObject, Position2d, Rotation2d
+
+MAGIC: bytes = b"PESN"
+DELTA_MAGIC: bytes = b"PESD"
+
+HAS_TRANSFORM: int = 1
+HAS_VELOCITY: int = 2
+HAS_CONTROLS: int = 4
+HAS_MODEL: int = 8
+
+# Column name -> array typecode. Every column has one value per entity, except
+# the camera columns which have one value per camera.
+ENTITY_COLUMNS: List[Tuple[str, str]] = [
+    ("mask", "B"),
+    ("x", "d"),
+    ("y", "d"),
+    ("rot", "d"),
+    ("velocity", "d"),
+    ("vel_mag", "d"),
+    ("vel_dir", "d"),
+    ("last90_mag", "d"),
+    ("last90_dir", "d"),
+    ("speed", "d"),
+    ("sprite", "i"),
+]
+CAMERA_COLUMNS: List[Tuple[str, str]] = [
+    ("cam_x", "d"),
+    ("cam_y", "d"),
+    ("cam_rot", "d"),
+    ("cam_zoom", "d"),
+]
+
+HEADER = struct.Struct("<4sIII")
+COLUMN_HEADER = struct.Struct("<I")
+
+
+class Snapshot(BaseObject):
+    """
+    A compact, column oriented copy of the world state.
+
+    Only plain numbers are stored: transforms, `VelocityControl` and `Controls`
+    state, the index of each `Model` sprite in `sprites`, and camera state.
+    Sprites themselves are shared resources and are kept by reference, never
+    copied. Components without a column are not captured.
+
+    Attributes:
+        tick: The engine tick the snapshot was taken on.
+        columns: The column arrays, keyed by name.
+        sprites: The sprites referenced by the `sprite` column.
+    """
+
+    def __init__(self, tick: int, columns: Dict[str, array], sprites: List[Sprite]) -> None:
+        self.tick = tick
+        self.columns = columns
+        self.sprites = sprites
+
+    @property
+    def entities(self) -> int:
+        return len(self.columns["mask"])
+
+    @property
+    def cameras(self) -> int:
+        return len(self.columns["cam_x"])
+
+    def ToBytes(self) -> bytes:
+        """
+        Serializes the snapshot. Sprite references are written as indices into `sprites`.
+        """
+        parts = [HEADER.pack(MAGIC, self.tick, self.entities, self.cameras)]
+        for name, _ in ENTITY_COLUMNS + CAMERA_COLUMNS:
+            parts.append(self.columns[name].tobytes())
+        return b"".join(parts)
+
+    @staticmethod
+    def FromBytes(data: bytes, sprites: List[Sprite]) -> "Snapshot":
+        """
+        Reads a snapshot written by `ToBytes`.
+
+        Args:
+            data: The serialized snapshot.
+            sprites: The sprite table the `sprite` column indexes into.
+        """
+        magic, tick, entities, cameras = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise Exception("Data is not a snapshot")
+
+        offset = HEADER.size
+        columns: Dict[str, array] = {}
+        for name, typecode in ENTITY_COLUMNS + CAMERA_COLUMNS:
+            column = array(typecode)
+            length = (entities if (name, typecode) in ENTITY_COLUMNS else cameras) * column.itemsize
+            column.frombytes(data[offset:offset + length])
+            columns[name] = column
+            offset += length
+
+        return Snapshot(tick, columns, sprites)
+
+    def __str__(self) -> str:
+        return f"Snapshot(tick={self.tick}, entities={self.entities}, cameras={self.cameras})"
+
+
+class Delta(BaseObject):
+    """
+    The values that changed between two snapshots with the same structure.
+
+    Attributes:
+        base_tick: The tick of the snapshot the delta applies to.
+        tick: The tick of the snapshot the delta produces.
+        changes: Column name -> (changed indices, new values).
+    """
+
+    def __init__(self, base_tick: int, tick: int, changes: Dict[str, Tuple[array, array]]) -> None:
+        self.base_tick = base_tick
+        self.tick = tick
+        self.changes = changes
+
+    def ToBytes(self) -> bytes:
+        parts = [HEADER.pack(DELTA_MAGIC, self.tick, self.base_tick, len(self.changes))]
+        names = [name for name, _ in ENTITY_COLUMNS + CAMERA_COLUMNS]
+        for name, (indices, values) in self.changes.items():
+            parts.append(COLUMN_HEADER.pack(names.index(name)))
+            parts.append(COLUMN_HEADER.pack(len(indices)))
+            parts.append(indices.tobytes())
+            parts.append(values.tobytes())
+        return b"".join(parts)
+
+    @staticmethod
+    def FromBytes(data: bytes) -> "Delta":
+        magic, tick, base_tick, count = HEADER.unpack_from(data, 0)
+        if magic != DELTA_MAGIC:
+            raise Exception("Data is not a snapshot delta")
+
+        columns = ENTITY_COLUMNS + CAMERA_COLUMNS
+        offset = HEADER.size
+        changes: Dict[str, Tuple[array, array]] = {}
+        for _ in range(count):
+            (column,) = COLUMN_HEADER.unpack_from(data, offset)
+            (length,) = COLUMN_HEADER.unpack_from(data, offset + COLUMN_HEADER.size)
+            offset += COLUMN_HEADER.size * 2
+
+            name, typecode = columns[column]
+            indices = array("I")
+            values = array(typecode)
+            indices.frombytes(data[offset:offset + length * indices.itemsize])
+            offset += length * indices.itemsize
+            values.frombytes(data[offset:offset + length * values.itemsize])
+            offset += length * values.itemsize
+
+            changes[name] = (indices, values)
+
+        return Delta(base_tick, tick, changes)
+
+    def __str__(self) -> str:
+        return f"Delta(base_tick={self.base_tick}, tick={self.tick}, columns={list(self.changes.keys())})"
+
+
+def Capture(gameobjects: List[GameObject], cameras: List[Camera2d], tick: int = 0, sprites: List[Sprite] | None = None) -> Snapshot:
+    """
+    Takes a snapshot of a world.
+
+    Args:
+        gameobjects: The objects to capture, in order.
+        cameras: The cameras to capture, in order.
+        tick: The tick to record on the snapshot.
+        sprites: A sprite table to reuse, so consecutive snapshots index sprites the same way.
+
+    Returns:
+        The snapshot.
+    """
+    columns: Dict[str, array] = {name: array(typecode) for name, typecode in ENTITY_COLUMNS + CAMERA_COLUMNS}
+    if sprites is None:
+        sprites = []
+    sprite_ids: Dict[int, int] = {id(sprite): i for i, sprite in enumerate(sprites)}
+
+    mask_col = columns["mask"]
+    x_col, y_col, rot_col = columns["x"], columns["y"], columns["rot"]
+    velocity_col = columns["velocity"]
+    vel_mag_col, vel_dir_col = columns["vel_mag"], columns["vel_dir"]
+    last90_mag_col, last90_dir_col = columns["last90_mag"], columns["last90_dir"]
+    speed_col, sprite_col = columns["speed"], columns["sprite"]
+
+    for g in gameobjects:
+        mask = 0
+        x = y = rot = 0.0
+        velocity = vel_mag = vel_dir = last90_mag = last90_dir = 0.0
+        speed = 0.0
+        sprite = -1
+
+        for comp in g.components:
+            if isinstance(comp, Transform):
+                mask |= HAS_TRANSFORM
+                pos = comp.pos
+                x, y, rot = pos.x, pos.y, pos.rot.x
+            elif isinstance(comp, VelocityControl):
+                mask |= HAS_VELOCITY
+                state = comp._state
+                current: Velocity = state["currentvelocity"]
+                last90: Velocity = state["last90vel"]
+                velocity = state["velocity"]
+                vel_mag, vel_dir = current.magnitude, current.direction
+                last90_mag, last90_dir = last90.magnitude, last90.direction
+            elif isinstance(comp, Controls):
+                mask |= HAS_CONTROLS
+                speed = comp._state["speed"]
+            elif isinstance(comp, Model):
+                mask |= HAS_MODEL
+                index = sprite_ids.get(id(comp.sprite))
+                if index is None:
+                    index = len(sprites)
+                    sprites.append(comp.sprite)
+                    sprite_ids[id(comp.sprite)] = index
+                sprite = index
+
+        mask_col.append(mask)
+        x_col.append(x)
+        y_col.append(y)
+        rot_col.append(rot)
+        velocity_col.append(velocity)
+        vel_mag_col.append(vel_mag)
+        vel_dir_col.append(vel_dir)
+        last90_mag_col.append(last90_mag)
+        last90_dir_col.append(last90_dir)
+        speed_col.append(speed)
+        sprite_col.append(sprite)
+
+    for camera in cameras:
+        columns["cam_x"].append(camera.pos.x)
+        columns["cam_y"].append(camera.pos.y)
+        columns["cam_rot"].append(camera.pos.rot.x)
+        columns["cam_zoom"].append(camera.zoom)
+
+    return Snapshot(tick, columns, sprites)
+
+
+def Restore(snapshot: Snapshot, gameobjects: List[GameObject], cameras: List[Camera2d]) -> None:
+    """
+    Writes a snapshot back into a world in place.
+
+    The world must have the same objects, in the same order and with the same
+    captured component types, as when the snapshot was taken.
+
+    Raises:
+        Exception: If the structure of the world does not match the snapshot.
+    """
+    if snapshot.entities != len(gameobjects) or snapshot.cameras != len(cameras):
+        raise Exception(
+            f"Snapshot has {snapshot.entities} objects and {snapshot.cameras} cameras, "
+            f"world has {len(gameobjects)} objects and {len(cameras)} cameras"
+        )
+
+    columns = snapshot.columns
+    mask_col = columns["mask"]
+    x_col, y_col, rot_col = columns["x"], columns["y"], columns["rot"]
+    velocity_col = columns["velocity"]
+    vel_mag_col, vel_dir_col = columns["vel_mag"], columns["vel_dir"]
+    last90_mag_col, last90_dir_col = columns["last90_mag"], columns["last90_dir"]
+    speed_col, sprite_col = columns["speed"], columns["sprite"]
+    sprites = snapshot.sprites
+
+    # Check the whole world before writing anything, so a mismatch never leaves it half restored
+    for i, g in enumerate(gameobjects):
+        if _Mask(g) != mask_col[i]:
+            raise Exception(f"Object {i} has different components to the snapshot")
+
+    for i, g in enumerate(gameobjects):
+        for comp in g.components:
+            if isinstance(comp, Transform):
+                comp.SetPosition(Position2d(x_col[i], y_col[i], Rotation2d(rot_col[i])))
+            elif isinstance(comp, VelocityControl):
+                state = comp._state
+                state["velocity"] = velocity_col[i]
+                state["currentvelocity"] = Velocity(vel_mag_col[i], vel_dir_col[i])
+                state["last90vel"] = Velocity(last90_mag_col[i], last90_dir_col[i])
+            elif isinstance(comp, Controls):
+                comp._state["speed"] = speed_col[i]
+            elif isinstance(comp, Model):
+                comp.sprite = sprites[sprite_col[i]]
+
+    for i, camera in enumerate(cameras):
+        camera.pos = Position2d(columns["cam_x"][i], columns["cam_y"][i], Rotation2d(columns["cam_rot"][i]))
+        camera.zoom = columns["cam_zoom"][i]
+
+
+def _Mask(g: GameObject) -> int:
+    mask = 0
+    for comp in g.components:
+        if isinstance(comp, Transform):
+            mask |= HAS_TRANSFORM
+        elif isinstance(comp, VelocityControl):
+            mask |= HAS_VELOCITY
+        elif isinstance(comp, Controls):
+            mask |= HAS_CONTROLS
+        elif isinstance(comp, Model):
+            mask |= HAS_MODEL
+    return mask
+
+
+def Diff(base: Snapshot, snapshot: Snapshot) -> Delta | None:
+    """
+    Computes the values that changed between two snapshots.
+
+    Returns:
+        The delta, or None if the snapshots have different structures and a full snapshot is needed.
+    """
+    if base.entities != snapshot.entities or base.cameras != snapshot.cameras:
+        return None
+    if base.columns["mask"] != snapshot.columns["mask"]:
+        return None
+
+    changes: Dict[str, Tuple[array, array]] = {}
+    for name, typecode in ENTITY_COLUMNS + CAMERA_COLUMNS:
+        old = base.columns[name]
+        new = snapshot.columns[name]
+        if old == new:
+            continue
+
+        indices = array("I", [i for i, (a, b) in enumerate(zip(old, new)) if a != b])
+        changes[name] = (indices, array(typecode, [new[i] for i in indices]))
+
+    return Delta(base.tick, snapshot.tick, changes)
+
+
+def Apply(base: Snapshot, delta: Delta) -> Snapshot:
+    """
+    Produces the snapshot a delta was computed for from its base snapshot.
+    """
+    if delta.base_tick != base.tick:
+        raise Exception(f"Delta applies to tick {delta.base_tick}, not {base.tick}")
+
+    columns = {name: array(column.typecode, column) for name, column in base.columns.items()}
+    for name, (indices, values) in delta.changes.items():
+        column = columns[name]
+        for i, value in zip(indices, values):
+            column[i] = value
+
+    return Snapshot(delta.tick, columns, base.sprites)
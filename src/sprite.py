@@ -1,18 +1,39 @@
 from dataclasses import dataclass
+import math
 from typing import List
 import pygame
+from atlas import AtlasRegion, TextureAtlas, default_atlas
+from fonts import GlyphCache, default_glyphs
 from logger import debug, warning
 from surface import Screen
+from transformcache import TransformCache, default_cache
 from utils import Color, Rotation2d, SquareSize
 from utils import BaseObject, Position2d
 
 class Sprite(BaseObject):
-    def __init__(self, size: int | float = 0) -> None:
+    def __init__(self, size: int | float = 0, scale: float = 1) -> None:
         self.length = size
+        self.scale = scale
+        self.cache: TransformCache = default_cache
 
     def Display(self, screen: Screen, pos: Position2d):
         warning("Unbound display method for base sprite class. Use inheritence for new sprites")
 
+    def Transformed(self, pos: Position2d, zoom: float = 1) -> bool:
+        """
+        Returns whether the sprite needs rotating or scaling to be displayed at `pos` on a screen with `zoom`.
+        """
+        return pos.rot.x % 360 != 0 or self.scale * zoom != 1
+
+    def Extent(self, pos: Position2d) -> float:
+        """
+        Returns the side length of a square that contains the sprite when displayed at `pos`.
+        """
+        extent = self.length * self.scale
+        if pos.rot.x % 90 != 0:
+            extent *= math.sqrt(2)
+        return extent
+
 class Square(Sprite):
     def __init__(self, size: SquareSize = SquareSize(200), color: Color = Color(255, 0, 0)) -> None:
         super().__init__(size.length)
@@ -20,7 +41,165 @@ class Square(Sprite):
         self.color: Color = color
 
     def Display(self, screen: Screen, pos: Position2d):
-        screen.square(self.size, self.color, pos)
+        if not self.Transformed(pos, screen.zoom):
+            screen.square(self.size, self.color, pos)
+            return
+
+        screen.blit(self.cache.Get(("square", self.size.length, self.color.rgb()), self._Surface, pos.rot.x, self.scale * screen.zoom), pos)
+
+    def _Surface(self) -> pygame.surface.Surface:
+        surface = pygame.Surface((self.size.length, self.size.length), pygame.SRCALPHA)
+        surface.fill(self.color.rgb())
+        return surface
+
+class ImageSprite(Sprite):
+    """
+    A sprite displaying an image packed into a texture atlas.
+
+    The image is loaded once per atlas and shared by reference between every
+    ImageSprite using the same path.
+    """
+
+    def __init__(self, path: str, atlas: TextureAtlas | None = None) -> None:
+        if atlas is None:
+            atlas = default_atlas
+
+        self.path = path
+        self.atlas: TextureAtlas = atlas
+        self.region: AtlasRegion | None = atlas.Load(path)
+
+        super().__init__(max(self.region.size))
+
+    def Display(self, screen: Screen, pos: Position2d):
+        if self.region is None:
+            return
+
+        if not self.Transformed(pos, screen.zoom):
+            screen.blit(self.region.surface, pos, self.region.rect)
+            return
+
+        screen.blit(self.cache.Get(("image", id(self.atlas), self.path), self._Surface, pos.rot.x, self.scale * screen.zoom), pos)
+
+    def _Surface(self) -> pygame.surface.Surface:
+        assert self.region is not None
+        return self.region.surface.subsurface(self.region.rect)
+
+    def Release(self) -> None:
+        """
+        Stops using the atlas region, allowing its page to be evicted once unused.
+        """
+        if self.region is not None:
+            self.atlas.Release(self.region)
+            self.region = None
+
+    def __copy__(self) -> "ImageSprite":
+        sprite = ImageSprite(self.path, self.atlas)
+        sprite.scale = self.scale
+        sprite.cache = self.cache
+        return sprite
+
+    def __deepcopy__(self, memo) -> "ImageSprite":
+        return self.__copy__()
+
+    def __del__(self) -> None:
+        if getattr(self, "region", None) is not None:
+            self.Release()
+
+class Text(Sprite):
+    """
+    A sprite displaying a line of text, such as a score or debug overlay.
+
+    Rendered text is cached by font, size, colour and content, so unchanged
+    text costs a single blit per frame. Text that changes often (counters,
+    FPS readouts) should be `dynamic`: it is drawn glyph by glyph from the
+    glyph cache, so new values never have to be rasterized, even when the
+    text is rotated or scaled.
+
+    Args:
+        text: The text to display.
+        size: The point size.
+        color: The text colour.
+        font: A font file, or None for pygame's default font.
+        dynamic: Whether to draw from cached glyphs instead of caching whole strings.
+        antialias: Whether to render smooth edges.
+        glyphs: The cache to render text with. Defaults to the shared glyph cache.
+    """
+
+    def __init__(
+        self,
+        text: str = "",
+        size: int = 24,
+        color: Color = Color(255, 255, 255),
+        font: str | None = None,
+        dynamic: bool = False,
+        antialias: bool = True,
+        glyphs: GlyphCache | None = None
+    ) -> None:
+        super().__init__()
+
+        if glyphs is None:
+            glyphs = default_glyphs
+
+        self.glyphs: GlyphCache = glyphs
+        self.font = (font, size)
+        self.color: Color = color
+        self.dynamic = dynamic
+        self.antialias = antialias
+        self.text = ""
+        self.SetText(text)
+
+    def SetText(self, text: str) -> None:
+        text = str(text)
+        if text == self.text and self.length:
+            return
+
+        self.text = text
+        if self.dynamic:
+            _, width, height = self.glyphs.Glyphs(self.font, self.color, text, self.antialias)
+        else:
+            width, height = self.glyphs.String(self.font, self.color, text, self.antialias).get_size()
+        self.length = max(width, height)
+
+    def Display(self, screen: Screen, pos: Position2d):
+        if not self.text:
+            return
+
+        if self.Transformed(pos, screen.zoom):
+            if self.dynamic:
+                self._DisplayGlyphs(screen, pos)
+            else:
+                key = ("text", self.font, self.color.rgb(), self.antialias, self.text)
+                screen.blit(self.cache.Get(key, self._Surface, pos.rot.x, self.scale * screen.zoom), pos)
+        elif self.dynamic:
+            glyphs, width, _ = self.glyphs.Glyphs(self.font, self.color, self.text, self.antialias)
+            x = pos.x - width / 2
+            for glyph in glyphs:
+                screen.blit(glyph.surface, Position2d(x + glyph.surface.get_width() / 2, pos.y, pos.rot))
+                x += glyph.advance
+        else:
+            screen.blit(self.glyphs.String(self.font, self.color, self.text, self.antialias), pos)
+
+    def _DisplayGlyphs(self, screen: Screen, pos: Position2d):
+        # Transform each glyph on its own, so a changing string only ever caches the characters it uses,
+        # and lay them out along the rotated baseline
+        scale = self.scale * screen.zoom
+        angle_index, scale_index = self.cache.Quantize(pos.rot.x, scale)
+        angle = math.radians(angle_index * self.cache.angle_step)
+        step = scale_index * self.cache.scale_step
+        dx, dy = math.cos(angle) * step, math.sin(angle) * step
+
+        rgb = self.color.rgb()
+        glyphs, width, _ = self.glyphs.Glyphs(self.font, self.color, self.text, self.antialias)
+        x = -width / 2
+        for char, glyph in zip(self.text, glyphs):
+            key = ("glyph", self.font, rgb, self.antialias, char)
+            surface = self.cache.Get(key, lambda glyph=glyph: glyph.surface, pos.rot.x, scale)
+            offset = x + glyph.surface.get_width() / 2
+            screen.blit(surface, Position2d(pos.x + offset * dx, pos.y + offset * dy, pos.rot))
+            x += glyph.advance
+
+    def _Surface(self) -> pygame.surface.Surface:
+        return self.glyphs.String(self.font, self.color, self.text, self.antialias)
 
 class Pixel(Sprite):
     def __init__(self, color: Color = Color(255, 0, 0)) -> None:
@@ -44,7 +223,7 @@ class PixelCollection(SpriteCollection):
     def DisplayAll(self, screen: Screen, pos: Position2d):
         i = 0
         for sprite in self.sprites:
-            sprite.Display(screen, pos+Position2d(i, 0, Rotation2d(0)))
+            sprite.Display(screen, pos+Position2d(i * screen.zoom, 0, Rotation2d(0)))
             i+=1
 
 class Pixels(Sprite):
@@ -3,14 +3,28 @@ from logger import debug
 from utils import BaseObject, Color, Position2d, Resolution, Rotation2d, SquareSize, copy
 
 class Screen(BaseObject):
-    def __init__(self, res: Resolution):
-        self._screen: pygame.surface.Surface = pygame.display.set_mode(res.pygame())
+    def __init__(self, res: Resolution, surface: pygame.surface.Surface | None = None):
+        if surface is None:
+            surface = pygame.display.set_mode(res.pygame())
+
+        self._screen: pygame.surface.Surface = surface
+        self.zoom: float = 1
+
+    def View(self, rect: pygame.Rect) -> "Screen":
+        """Returns a Screen drawing into an area of this one.
+
+        The view shares pixels with this screen, so nothing has to be copied back.
+
+        Args:
+            rect (pygame.Rect): The area of the screen covered by the view.
+        """
+        return Screen(Resolution(rect.width, rect.height), self._screen.subsurface(rect))
 
     def fill(self, color: Color):
         self._screen.fill(color.rgb())
 
     def set_at(self, pos: Position2d, col: Color):
-        self.square(SquareSize(1), col, pos)
+        self.square(SquareSize(max(1, self.zoom)), col, pos)
 
     def square(self, size: SquareSize, color: Color, pos: Position2d):
         """Draws a square on the Pygame surface with center-based positioning.
@@ -25,3 +39,15 @@ class Screen(BaseObject):
         pos += Position2d(self._screen.get_width() / 2 - size.length / 2, self._screen.get_height() / 2 - size.length / 2, Rotation2d(0))
 
         pygame.draw.rect(self._screen, color.rgb(), pygame.Rect(pos.x, pos.y, size.length, size.length))
+
+    def blit(self, surface: pygame.surface.Surface, pos: Position2d, area: pygame.Rect | None = None):
+        """Draws a surface (or an area of it) on the Pygame surface with center-based positioning.
+
+        Args:
+            surface (pygame.surface.Surface): The surface to draw from.
+            pos (Position2d): Object defining the center coordinates of the drawn area.
+            area (pygame.Rect | None): The area of `surface` to draw. Defaults to the whole surface.
+        """
+        width, height = area.size if area is not None else surface.get_size()
+
+        self._screen.blit(surface, (pos.x + self._screen.get_width() / 2 - width / 2, pos.y + self._screen.get_height() / 2 - height / 2), area)
@@ -0,0 +1,138 @@
+import asyncio
+from typing import Any, Callable, Coroutine, Dict, List, Tuple
+
+from event import TaskDone
+from logger import error
+from utils import BaseObject
+
+
+class TaskRunner(BaseObject):
+    """
+    Runs coroutines on the engine's event loop and hands their results back on a later tick.
+
+    Coroutines run concurrently with the simulation while the engine is
+    driven by `Engine.RunAsync`, so I/O such as uploads, saves or network
+    messages never stalls a frame. When a coroutine finishes, its result is
+    queued and delivered at the start of the next tick, either to a callback
+    or as a `TaskDone` event on a component (which also wakes it).
+    """
+
+    def __init__(self) -> None:
+        self.tasks: Dict[asyncio.Task, Tuple[Any, Callable[[Any], None] | None, str]] = {}
+        self.owners: Dict[int, List[asyncio.Task]] = {}
+        self.done: List[asyncio.Task] = []
+
+    def Submit(
+        self,
+        coroutine: Coroutine,
+        callback: Callable[[Any], None] | None = None,
+        owner: Any = None,
+        name: str = ""
+    ) -> asyncio.Task:
+        """
+        Starts a coroutine. Must be called while the engine runs with `RunAsync`.
+
+        Args:
+            coroutine: The coroutine to run.
+            callback: Called with the result on the tick after the coroutine finishes.
+            owner: A component to send a `TaskDone` event to, or any object whose tasks should be cancelled
+                with it by `CancelOwner`.
+            name: A name for the task, passed along in its `TaskDone` event.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            coroutine.close()
+            raise Exception("Coroutines can only be scheduled while the engine runs with RunAsync")
+
+        task = loop.create_task(coroutine)
+        self.tasks[task] = (owner, callback, name)
+        if owner is not None:
+            self.owners.setdefault(id(owner), []).append(task)
+
+        task.add_done_callback(self._Finished)
+        return task
+
+    def Deliver(self) -> int:
+        """
+        Hands the results of the coroutines that finished since the last call to their callbacks and owners.
+
+        Returns:
+            The number of results delivered.
+        """
+        if not self.done:
+            return 0
+
+        done = self.done
+        self.done = []
+        delivered = 0
+        for task in done:
+            entry = self.tasks.pop(task, None)
+            if entry is None or task.cancelled():
+                continue
+            owner, callback, name = entry
+            self._Disown(owner, task)
+
+            exception = task.exception()
+            result = None if exception is not None else task.result()
+            if exception is not None:
+                error(f"Task {name or task.get_name()} failed: {exception!r}")
+            elif callback is not None:
+                callback(result)
+
+            manager = getattr(owner, "eventmanager", None)
+            if manager is not None:
+                manager.add_event(TaskDone(0, name, {"result": result, "error": exception}))
+
+            delivered += 1
+
+        return delivered
+
+    def CancelOwner(self, owner: Any) -> int:
+        """
+        Cancels every running task belonging to an owner.
+
+        Returns:
+            The number of tasks cancelled.
+        """
+        tasks = self.owners.pop(id(owner), [])
+        for task in tasks:
+            task.cancel()
+            self.tasks.pop(task, None)
+        return len(tasks)
+
+    def CancelAll(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+        self.tasks = {}
+        self.owners = {}
+        self.done = []
+
+    @property
+    def count(self) -> int:
+        return len(self.tasks)
+
+    def _Finished(self, task: asyncio.Task) -> None:
+        self.done.append(task)
+
+    def _Disown(self, owner: Any, task: asyncio.Task) -> None:
+        if owner is None:
+            return
+
+        tasks = self.owners.get(id(owner))
+        if tasks is not None:
+            tasks.remove(task)
+            if not tasks:
+                del self.owners[id(owner)]
+
+    def __eq__(self, other) -> bool:
+        return self is other
+
+    def __hash__(self) -> int:
+        return id(self)
+
+    def __str__(self) -> str:
+        return f"TaskRunner(running={len(self.tasks)}, finished={len(self.done)})"
+
+
+default_tasks: TaskRunner = TaskRunner()
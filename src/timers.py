@@ -0,0 +1,205 @@
+from typing import Any, Callable, Dict, List
+
+from utils import BaseObject
+
+SLOT_BITS: int = 6
+SLOTS: int = 1 << SLOT_BITS
+SLOT_MASK: int = SLOTS - 1
+LEVELS: int = 4
+
+
+class TimerHandle(BaseObject):
+    """
+    A callback scheduled on a TimerWheel. Returned by `TimerWheel.Schedule` and used to cancel it.
+
+    Attributes:
+        expires: The tick the callback runs on next.
+        interval: The number of ticks between runs of a repeating timer, or None.
+        owner: The object the timer belongs to, so it can be cancelled with it.
+        cancelled: Whether the timer has been cancelled.
+    """
+
+    def __init__(self, id: int, expires: int, callback: Callable[[], None], interval: int | None, owner: Any) -> None:
+        self.id = id
+        self.expires = expires
+        self.callback = callback
+        self.interval = interval
+        self.owner = owner
+        self.cancelled = False
+
+        # The slot dict the handle is stored in, for O(1) removal
+        self._slot: Dict[int, "TimerHandle"] | None = None
+
+    @property
+    def active(self) -> bool:
+        return not self.cancelled and self._slot is not None
+
+    def __eq__(self, other) -> bool:
+        return self is other
+
+    def __hash__(self) -> int:
+        return self.id
+
+    def __str__(self) -> str:
+        return f"TimerHandle(id={self.id}, expires={self.expires}, interval={self.interval}, cancelled={self.cancelled})"
+
+
+class TimerWheel(BaseObject):
+    """
+    A hierarchical timer wheel driven by simulation ticks.
+
+    Each level has `SLOTS` slots; level N covers ticks that differ from the
+    current tick only in bits below `SLOT_BITS * (N + 1)`. Timers further out
+    than the last level wait in an overflow list. Scheduling and cancelling
+    are O(1), and each `Advance` only touches the slot for the new tick (plus
+    an occasional cascade of one higher-level slot), however many timers are
+    pending.
+
+    Attributes:
+        now: The current tick.
+    """
+
+    def __init__(self) -> None:
+        self.now: int = 0
+        self.wheels: List[List[Dict[int, TimerHandle]]] = [[{} for _ in range(SLOTS)] for _ in range(LEVELS)]
+        self.overflow: Dict[int, TimerHandle] = {}
+        self.owners: Dict[int, Dict[int, TimerHandle]] = {}
+        self.count: int = 0
+        self._ids: int = 0
+
+    def Schedule(self, delay: int, callback: Callable[[], None], repeat: bool = False, owner: Any = None) -> TimerHandle:
+        """
+        Schedules a callback.
+
+        Args:
+            delay: The number of ticks from now to run the callback (at least 1).
+            callback: The function to call.
+            repeat: Whether to run the callback again every `delay` ticks until cancelled.
+            owner: The object the timer belongs to, so `CancelOwner` can cancel it (e.g. when a GameObject is removed).
+
+        Returns:
+            The timer's handle.
+        """
+        delay = max(1, int(delay))
+        self._ids += 1
+        handle = TimerHandle(self._ids, self.now + delay, callback, delay if repeat else None, owner)
+
+        if owner is not None:
+            self.owners.setdefault(id(owner), {})[handle.id] = handle
+
+        self._Insert(handle)
+        self.count += 1
+        return handle
+
+    def Cancel(self, handle: TimerHandle) -> None:
+        """
+        Cancels a timer. Cancelling a timer that already ran or was cancelled does nothing.
+        """
+        if handle.cancelled:
+            return
+
+        handle.cancelled = True
+        if handle._slot is not None:
+            del handle._slot[handle.id]
+            handle._slot = None
+            self.count -= 1
+
+        self._Disown(handle)
+
+    def CancelOwner(self, owner: Any) -> int:
+        """
+        Cancels every timer belonging to an owner.
+
+        Returns:
+            The number of timers cancelled.
+        """
+        handles = self.owners.pop(id(owner), None)
+        if handles is None:
+            return 0
+
+        for handle in list(handles.values()):
+            handle.owner = None
+            self.Cancel(handle)
+        return len(handles)
+
+    def Advance(self) -> int:
+        """
+        Moves on one tick and runs every callback that expires on it.
+
+        Returns:
+            The number of callbacks run.
+        """
+        self.now += 1
+        now = self.now
+
+        # Move timers down from higher levels when the lower levels wrap around
+        level = 1
+        while level < LEVELS and (now & ((1 << (SLOT_BITS * level)) - 1)) == 0:
+            self._Cascade(self.wheels[level][(now >> (SLOT_BITS * level)) & SLOT_MASK])
+            level += 1
+        if level == LEVELS and (now & ((1 << (SLOT_BITS * LEVELS)) - 1)) == 0:
+            self._Cascade(self.overflow)
+
+        slot = self.wheels[0][now & SLOT_MASK]
+        if not slot:
+            return 0
+
+        due = list(slot.values())
+        slot.clear()
+
+        for handle in due:
+            handle._slot = None
+            self.count -= 1
+
+        for handle in due:
+            if handle.cancelled:
+                continue
+
+            handle.callback()
+
+            if handle.interval is not None and not handle.cancelled:
+                handle.expires += handle.interval
+                self._Insert(handle)
+                self.count += 1
+            elif handle.interval is None:
+                self._Disown(handle)
+
+        return len(due)
+
+    def _Insert(self, handle: TimerHandle) -> None:
+        expires = handle.expires
+        now = self.now
+
+        level = 0
+        while level < LEVELS and (expires >> (SLOT_BITS * (level + 1))) != (now >> (SLOT_BITS * (level + 1))):
+            level += 1
+
+        if level == LEVELS:
+            slot = self.overflow
+        else:
+            slot = self.wheels[level][(expires >> (SLOT_BITS * level)) & SLOT_MASK]
+
+        slot[handle.id] = handle
+        handle._slot = slot
+
+    def _Cascade(self, slot: Dict[int, TimerHandle]) -> None:
+        if not slot:
+            return
+
+        handles = list(slot.values())
+        slot.clear()
+        for handle in handles:
+            self._Insert(handle)
+
+    def _Disown(self, handle: TimerHandle) -> None:
+        if handle.owner is None:
+            return
+
+        handles = self.owners.get(id(handle.owner))
+        if handles is not None:
+            handles.pop(handle.id, None)
+            if not handles:
+                del self.owners[id(handle.owner)]
+
+    def __str__(self) -> str:
+        return f"TimerWheel(now={self.now}, pending={self.count})"
@@ -0,0 +1,110 @@
+from collections import OrderedDict
+from typing import Callable, Hashable, Tuple
+
+import pygame
+from utils import BaseObject
+
+
+class TransformCache(BaseObject):
+    """
+    An LRU cache of rotated and scaled surfaces.
+
+    Angles and scales are quantized to `angle_step` degrees and `scale_step`
+    so that many sprites at similar transforms share one `rotozoom` result.
+    The cache is bounded by `budget` bytes; the least recently used surfaces
+    are dropped first.
+
+    Attributes:
+        angle_step: The angle quantization in degrees.
+        scale_step: The scale quantization.
+        budget: The maximum number of bytes of cached surfaces.
+    """
+
+    def __init__(self, angle_step: float = 5, scale_step: float = 0.05, budget: int = 32 * 1024 * 1024) -> None:
+        self.angle_step = angle_step
+        self.scale_step = scale_step
+        self.budget = budget
+
+        self.entries: OrderedDict[Tuple[Hashable, int, int], pygame.surface.Surface] = OrderedDict()
+        self.memory = 0
+        self.hits = 0
+        self.misses = 0
+
+    def Quantize(self, angle: float, scale: float) -> Tuple[int, int]:
+        """
+        Returns the angle and scale step indices used as cache keys.
+        """
+        steps = round(360 / self.angle_step)
+        return round(angle / self.angle_step) % steps, max(1, round(scale / self.scale_step))
+
+    def Get(self, key: Hashable, source: Callable[[], pygame.surface.Surface], angle: float, scale: float = 1) -> pygame.surface.Surface:
+        """
+        Returns `source` rotated clockwise by `angle` degrees and scaled by `scale`.
+
+        Args:
+            key: A stable key identifying the source image.
+            source: Returns the untransformed surface. Only called on a cache miss.
+            angle: The rotation in degrees (clockwise, matching `Velocity.direction`).
+            scale: The scale factor.
+
+        Returns:
+            The transformed surface. It is shared and must not be modified.
+        """
+        angle_index, scale_index = self.Quantize(angle, scale)
+        entry_key = (key, angle_index, scale_index)
+
+        surface = self.entries.get(entry_key)
+        if surface is not None:
+            self.hits += 1
+            self.entries.move_to_end(entry_key)
+            return surface
+
+        self.misses += 1
+        base = source()
+        if angle_index == 0 and scale_index * self.scale_step == 1:
+            surface = base
+        else:
+            surface = pygame.transform.rotozoom(base, -angle_index * self.angle_step, scale_index * self.scale_step)
+
+        size = self._Size(surface)
+        if size > self.budget:
+            # Too big to keep, hand it back without caching it
+            return surface
+
+        self.entries[entry_key] = surface
+        self.memory += size
+        self._Trim()
+
+        return surface
+
+    def Clear(self) -> None:
+        self.entries.clear()
+        self.memory = 0
+
+    def Stats(self) -> dict:
+        return {
+            "entries": len(self.entries),
+            "bytes": self.memory,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _Trim(self) -> None:
+        while self.memory > self.budget and self.entries:
+            _, surface = self.entries.popitem(last=False)
+            self.memory -= self._Size(surface)
+
+    def _Size(self, surface: pygame.surface.Surface) -> int:
+        return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+    def __copy__(self) -> "TransformCache":
+        return self
+
+    def __deepcopy__(self, memo) -> "TransformCache":
+        return self
+
+    def __str__(self) -> str:
+        return f"TransformCache(entries={len(self.entries)}, bytes={self.memory})"
+
+
+default_cache: TransformCache = TransformCache()